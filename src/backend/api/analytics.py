@@ -0,0 +1,99 @@
+import math
+from itertools import groupby
+from django.db import connection
+from django.db.models import Aggregate, Avg, Count, F, FloatField, Q, Sum
+from django.db.models.functions import TruncMonth, TruncWeek
+
+from .models import Order
+
+
+LATE_AFTER_MINUTES = 30
+DELIVERED = ("confirmed", "completed")
+GROUP_BY_CHOICES = ("driver", "area", "zone", "period")
+PERIODS = {"day": F("delivery_date"), "week": TruncWeek("delivery_date"), "month": TruncMonth("delivery_date")}
+
+
+class PercentileCont(Aggregate):
+    function = "PERCENTILE_CONT"
+    name = "PercentileCont"
+    template = "%(function)s(%(percentile)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, percentile, **extra):
+        super().__init__(expression, percentile=percentile, **extra)
+
+
+def group_columns(group_by, granularity):
+    # None marks a column read straight from Order.
+    if group_by == "driver":
+        return {"driver_id": None, "driver_name": F("driver__username")}
+    if group_by == "area":
+        return {"area": F("customer__area")}
+    if group_by == "zone":
+        return {"zone": F("customer__zone_number")}
+    return {"period": PERIODS[granularity]}
+
+
+def percentile(values, fraction):
+    # Same interpolation as PostgreSQL's percentile_cont; values are sorted.
+    position = fraction * (len(values) - 1)
+    lower = math.floor(position)
+    upper = min(lower + 1, len(values) - 1)
+    return values[lower] + (values[upper] - values[lower]) * (position - lower)
+
+
+def python_p95(orders, columns):
+    # Fallback for databases without ordered-set aggregates: only the
+    # delays of delivered orders are read, already sorted per group.
+    names = list(columns)
+    delays = (
+        orders.filter(status__in=DELIVERED, confirmation_delay__isnull=False)
+        .values_list(*names, "confirmation_delay")
+        .order_by(*names, "confirmation_delay")
+    )
+    return {
+        key: percentile([row[-1] for row in rows], 0.95)
+        for key, rows in groupby(delays, key=lambda row: row[:-1])
+    }
+
+
+def ratio(part, whole):
+    return round(part / whole, 4) if whole else None
+
+
+def delivery_performance(start, end, group_by="driver", granularity="day"):
+    """On-time rate, confirmation delay (average and p95, in seconds),
+    gallons delivered and problem rate for orders due between ``start`` and
+    ``end``, one row per driver, customer area, zone or period."""
+    columns = group_columns(group_by, granularity)
+    delivered = Q(status__in=DELIVERED)
+    aggregates = {
+        "orders": Count("id"),
+        "delivered": Count("id", filter=delivered),
+        "timed": Count("id", filter=delivered & Q(confirmation_delay__isnull=False)),
+        "on_time": Count("id", filter=delivered & Q(confirmation_delay__lte=LATE_AFTER_MINUTES * 60)),
+        "problems": Count("id", filter=Q(status="problem")),
+        "gallons": Sum("filled_amount", filter=delivered, default=0),
+        "avg_delay": Avg("confirmation_delay", filter=delivered),
+    }
+    postgres = connection.vendor == "postgresql"
+    if postgres:
+        aggregates["p95_delay"] = PercentileCont("confirmation_delay", 0.95, filter=delivered)
+
+    orders = Order.objects.filter(delivery_date__range=(start, end)).exclude(status="canceled").annotate(
+        **{name: expression for name, expression in columns.items() if expression is not None}
+    )
+    rows = list(orders.values(*columns).annotate(**aggregates).order_by(*columns))
+    if not postgres:
+        p95 = python_p95(orders, columns)
+        for row in rows:
+            row["p95_delay"] = p95.get(tuple(row[name] for name in columns))
+
+    for row in rows:
+        # Deliveries without a confirmation time can't be judged either way.
+        row["on_time_rate"] = ratio(row["on_time"], row.pop("timed"))
+        row["problem_rate"] = ratio(row["problems"], row["orders"])
+        for field in ("avg_delay", "p95_delay"):
+            if row[field] is not None:
+                row[field] = round(row[field], 1)
+    return rows
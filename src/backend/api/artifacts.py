@@ -0,0 +1,60 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+
+# Rendered invoice documents, one directory per invoice and kind, each file
+# named after the hash of everything it was rendered from. A changed input
+# gives a new name, so a stale file is never served.
+ARTIFACT_KINDS = ("pdf", "xlsx")
+
+
+def artifact_key(kind, version, inputs):
+    payload = json.dumps([kind, version, inputs], sort_keys=True, cls=DjangoJSONEncoder)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def artifact_dir(kind, owner_id):
+    return os.path.join(settings.INVOICE_ARTIFACT_ROOT, kind, str(owner_id))
+
+
+def open_artifact(kind, owner_id, key, render):
+    """The ``kind`` artifact with ``key``, opened for reading, calling
+    ``render(fileobj)`` to produce it on a miss. Older artifacts of the same
+    owner are dropped once the new one is open; a reader that already holds
+    one keeps reading it, and one that lost the race renders it again."""
+    directory = artifact_dir(kind, owner_id)
+    path = os.path.join(directory, f"{key}.{kind}")
+    try:
+        return open(path, "rb")
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(directory, exist_ok=True)
+    artifact = tempfile.NamedTemporaryFile(dir=directory, suffix=".tmp", delete=False)
+    try:
+        render(artifact)
+        artifact.flush()
+        os.replace(artifact.name, path)
+    except BaseException:
+        artifact.close()
+        os.unlink(artifact.name)
+        raise
+    artifact.seek(0)
+
+    for name in os.listdir(directory):
+        if name != os.path.basename(path) and not name.endswith(".tmp"):
+            try:
+                os.unlink(os.path.join(directory, name))
+            except FileNotFoundError:
+                pass
+    return artifact
+
+
+def discard_artifacts(owner_id):
+    for kind in ARTIFACT_KINDS:
+        shutil.rmtree(artifact_dir(kind, owner_id), ignore_errors=True)
@@ -0,0 +1,140 @@
+from functools import partial
+from django.core.files.storage import default_storage
+from django.db import transaction
+from django.utils import timezone
+
+from .metrics import invalidate_dashboard_metrics
+from .models import Order, RecheckAccumulator, UploadSession, DriverActionReceipt, confirmation_delay
+from .signals import publish_order_change
+from .tasks import process_proof_image
+from .uploads import open_upload, discard_upload
+
+
+BATCH_FIELDS = ["status", "filled_amount", "proof_image", "proof_thumbnail", "confirmed_at", "confirmation_delay", "problem_reason", "updated_at"]
+
+
+def upload_for(item, uploads):
+    # An upload only proves the order it was started for.
+    upload = uploads.get(item.get("upload_id"))
+    return upload if upload is not None and upload.order_id == item["order"] else None
+
+
+def proof_for(item, files, uploads):
+    upload = upload_for(item, uploads)
+    if upload is not None:
+        return open_upload(upload), upload
+    return files.get(f"proof_image.{item['key']}"), None
+
+
+def item_error(order, item, files, uploads):
+    if order is None:
+        return "This order is not assigned to you"
+    if item["action"] == "problem":
+        return None if item.get("reason") else "Problem reason is required"
+    if order.status != "pending":
+        return "Order already confirmed or completed"
+    has_file = f"proof_image.{item['key']}" in files
+    if item.get("upload_id") and not has_file and upload_for(item, uploads) is None:
+        return "Upload not found or not complete"
+    if not item.get("filled_amount") or not (has_file or upload_for(item, uploads)):
+        return "Both filled amount and proof image are required"
+    return None
+
+
+def apply_driver_batch(driver, items, files):
+    """Apply a driver's queued confirmations and problem reports in one
+    transaction and return a result per item, in order. Items are checked
+    one by one against the state left by the items before them. Keys that
+    were applied before get their stored result back."""
+    stored = []
+    try:
+        with transaction.atomic():
+            results = apply_items(driver, items, files, stored)
+    except BaseException:
+        # Proofs reach storage as their items are applied; a batch that
+        # rolls back must not leave them behind.
+        for name in stored:
+            default_storage.delete(name)
+        raise
+    return [results[item["key"]] for item in items]
+
+
+def apply_items(driver, items, files, stored):
+    now = timezone.now()
+    results = {}
+    previous = {}
+    receipts = []
+    used_uploads = []
+
+    replayed = dict(
+        DriverActionReceipt.objects.filter(driver=driver, key__in=[item["key"] for item in items])
+        .values_list("key", "result")
+    )
+    fresh = [item for item in items if item["key"] not in replayed]
+    orders = Order.objects.select_for_update().filter(driver=driver).in_bulk({item["order"] for item in fresh})
+    uploads = UploadSession.objects.filter(driver=driver, status="complete").in_bulk(
+        {item["upload_id"] for item in fresh if item.get("upload_id")}
+    )
+
+    for item in items:
+        key = item["key"]
+        if key in replayed:
+            results[key] = {**replayed[key], "replayed": True}
+            continue
+        order = orders.get(item["order"])
+        error = item_error(order, item, files, uploads)
+        if error:
+            results[key] = {"key": key, "order": item["order"], "ok": False, "error": error}
+            continue
+
+        previous.setdefault(order.pk, (order.status, getattr(order, "_loaded_billing", None)))
+        if item["action"] == "confirm":
+            proof, upload = proof_for(item, files, uploads)
+            with proof:
+                order.proof_image.save(proof.name, proof, save=False)
+            stored.append(order.proof_image.name)
+            if upload is not None:
+                used_uploads.append(upload)
+                del uploads[upload.pk]
+            order.proof_thumbnail = None
+            order.status = "confirmed"
+            order.filled_amount = item["filled_amount"]
+            order.confirmed_at = now
+            order.confirmation_delay = confirmation_delay(now, order.delivery_time, order.created_at)
+        else:
+            order.status = "problem"
+            order.problem_reason = item["reason"]
+        order.updated_at = now
+
+        result = {"key": key, "order": order.pk, "ok": True, "action": item["action"], "status": order.status}
+        results[key] = result
+        receipts.append(DriverActionReceipt(driver=driver, key=key, order=order, action=item["action"], result=result))
+
+    if previous:
+        changed = [orders[pk] for pk in previous]
+        Order.objects.bulk_update(changed, BATCH_FIELDS)
+
+        # bulk_update skips Order.save() and its signals; do their work here.
+        billing = []
+        for order in changed:
+            status, before = previous[order.pk]
+            after = order.billing_contribution()
+            if before != after:
+                if before:
+                    billing.append((before[0], before[1], -1, -before[2]))
+                if after:
+                    billing.append((after[0], after[1], 1, after[2]))
+            order._loaded_billing = after
+            order._loaded_status = order.status
+            publish_order_change(order, status)
+            if order.status == "confirmed" and status != "confirmed":
+                transaction.on_commit(partial(process_proof_image.delay, order.pk))
+        RecheckAccumulator.record_many(billing)
+        transaction.on_commit(invalidate_dashboard_metrics)
+
+    if used_uploads:
+        UploadSession.objects.filter(pk__in=[upload.pk for upload in used_uploads]).update(status="used", updated_at=now)
+        for upload in used_uploads:
+            transaction.on_commit(partial(discard_upload, upload))
+    DriverActionReceipt.objects.bulk_create(receipts)
+    return results
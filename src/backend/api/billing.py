@@ -0,0 +1,87 @@
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from .metrics import invalidate_dashboard_metrics
+from .models import CustomerLedger, FinalInvoice, RecheckInvoice, invoice_totals
+
+
+def price_for(recheck_id, group, schedule):
+    recheck_prices = schedule.get("recheck_prices", {})
+    group_prices = schedule.get("group_prices", {})
+    if str(recheck_id) in recheck_prices:
+        return recheck_prices[str(recheck_id)]
+    if group is not None and str(group) in group_prices:
+        return group_prices[str(group)]
+    return schedule.get("price_per_gallon")
+
+
+def finalize_rechecks(accountant, schedule):
+    """Issue final invoices for many rechecks in one transaction.
+
+    ``schedule`` is a validated BulkFinalizeSerializer payload. Prices resolve
+    per recheck, then per customer group, then to the default price. Returns
+    one result per recheck; rechecks that can't be invoiced get an error and
+    don't hold back the others.
+    """
+    group_field = f"customer__{schedule['group_by']}" if schedule.get("group_by") else None
+    vat_percent = schedule.get("vat_percent", FinalInvoice._meta.get_field("vat_percent").default)
+    notes = schedule.get("notes", "")
+    requested = schedule.get("rechecks")
+
+    with transaction.atomic():
+        rechecks = RecheckInvoice.objects.select_for_update(of=("self",)).filter(
+            assigned_to=accountant, status="sent"
+        ).annotate(finalized=Exists(FinalInvoice.objects.filter(recheck=OuterRef("pk"))))
+        rechecks = rechecks.filter(pk__in=requested) if requested else rechecks.filter(finalized=False)
+        rows = {
+            row[0]: row[1:]
+            for row in rechecks.values_list("id", "total_gallons", "finalized", "customer_id", *([group_field] if group_field else []))
+        }
+
+        results = []
+        invoices = []
+        for recheck_id in requested or sorted(rows):
+            if recheck_id not in rows:
+                results.append({"recheck": recheck_id, "ok": False, "error": "Recheck not found or not assigned to you."})
+                continue
+            gallons, finalized, customer_id, *group = rows[recheck_id]
+            if finalized:
+                results.append({"recheck": recheck_id, "ok": False, "error": "Recheck already has a final invoice."})
+                continue
+            price = price_for(recheck_id, group[0] if group else None, schedule)
+            if price is None:
+                results.append({"recheck": recheck_id, "ok": False, "error": "No price in the schedule for this recheck."})
+                continue
+            subtotal, vat_amount, total = invoice_totals(gallons, price, vat_percent)
+            invoices.append(FinalInvoice(
+                recheck_id=recheck_id,
+                created_by=accountant,
+                price_per_gallon=price,
+                vat_percent=vat_percent,
+                subtotal=subtotal,
+                vat_amount=vat_amount,
+                total=total,
+                notes=notes,
+            ))
+            results.append({"recheck": recheck_id, "ok": True})
+
+        # bulk_create skips FinalInvoice.save(); the totals are already set
+        # and the ledger is moved here.
+        created = {invoice.recheck_id: invoice for invoice in FinalInvoice.objects.bulk_create(invoices)}
+        if created:
+            CustomerLedger.record_many(
+                (rows[recheck_id][2], invoice.total, 1, 0, 0) for recheck_id, invoice in created.items()
+            )
+            transaction.on_commit(invalidate_dashboard_metrics)
+
+    for result in results:
+        invoice = created.get(result["recheck"])
+        if invoice is not None:
+            result.update(
+                invoice=invoice.pk,
+                price_per_gallon=invoice.price_per_gallon,
+                subtotal=invoice.subtotal,
+                vat_amount=invoice.vat_amount,
+                total=invoice.total,
+            )
+    return results
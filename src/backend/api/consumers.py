@@ -0,0 +1,22 @@
+from channels.generic.websocket import AsyncJsonWebsocketConsumer
+
+from .realtime import groups_for_user
+
+
+class EventsConsumer(AsyncJsonWebsocketConsumer):
+    async def connect(self):
+        user = self.scope.get("user")
+        if user is None or not user.is_authenticated:
+            await self.close(code=4401)
+            return
+        self.event_groups = groups_for_user(user)
+        for group in self.event_groups:
+            await self.channel_layer.group_add(group, self.channel_name)
+        await self.accept()
+
+    async def disconnect(self, code):
+        for group in getattr(self, "event_groups", []):
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def events_batch(self, message):
+        await self.send_json({"events": message["events"]})
@@ -0,0 +1,100 @@
+import hashlib
+import json
+import tempfile
+from datetime import timedelta
+from urllib.parse import urlencode
+from django.conf import settings
+from django.core.files import File
+from django.http import HttpRequest, QueryDict
+from django.utils import timezone
+from rest_framework.request import Request
+
+from .exports import write_xlsx
+from .models import ExportJob
+from .views.complaints import ComplaintViewSet
+from .views.customers import CustomerViewSet
+from .invoice_pdf import render_invoice_pdf
+from .views.invoices import AccountantInvoiceViewSet, AdminRecheckViewSet
+from .views.orders import OrderViewSet
+from .views.users import UserViewSet
+
+
+# kind -> (viewset, action); the viewset supplies permissions, the base
+# queryset, filtering and, for xlsx kinds, the export spec.
+EXPORT_KINDS = {
+    "orders": (OrderViewSet, "export_excel"),
+    "customers": (CustomerViewSet, "export_excel"),
+    "users": (UserViewSet, "export_excel"),
+    "complaints": (ComplaintViewSet, "export_excel"),
+    "rechecks": (AdminRecheckViewSet, "export_excel"),
+    "invoice_pdf": (AccountantInvoiceViewSet, "export_pdf"),
+}
+
+
+def params_hash(kind, params):
+    payload = json.dumps([kind, params], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def build_view(kind, user, params, request=None):
+    """Instantiate the viewset behind an export kind as if it were handling
+    a GET with ``params`` as its query string."""
+    view_class, action = EXPORT_KINDS[kind]
+    if request is None:
+        http_request = HttpRequest()
+        http_request.method = "GET"
+        http_request.GET = QueryDict(urlencode(params, doseq=True))
+        request = Request(http_request)
+        request.user = user
+    view = view_class()
+    view.request = request
+    view.args = ()
+    view.kwargs = {"pk": params["id"]} if "id" in params else {}
+    view.format_kwarg = None
+    view.action = action
+    view.action_map = {"get": action}
+    return view
+
+
+def reusable_job(user, kind, params):
+    return ExportJob.objects.filter(
+        created_by=user,
+        kind=kind,
+        params_hash=params_hash(kind, params),
+        status__in=["pending", "running", "done"],
+        created_at__gte=timezone.now() - timedelta(seconds=settings.EXPORT_JOB_REUSE_TTL),
+    ).first()
+
+
+def run_export(job):
+    view = build_view(job.kind, job.created_by, job.params)
+
+    if job.kind == "invoice_pdf":
+        final = view.get_object()
+        job.total = 1
+        job.save(update_fields=["total"])
+        with tempfile.TemporaryFile() as output:
+            output.write(render_invoice_pdf(final))
+            output.seek(0)
+            job.file.save(f"invoice_{final.id}.pdf", File(output), save=False)
+        job.progress = 1
+        return
+
+    spec = view.export_spec
+    queryset = view.filter_queryset(view.get_queryset())
+    job.total = queryset.count()
+    job.save(update_fields=["total"])
+
+    def tracked(rows):
+        written = 0
+        for row in rows:
+            yield row
+            written += 1
+            if written % settings.EXPORT_CHUNK_SIZE == 0:
+                ExportJob.objects.filter(pk=job.pk).update(progress=written)
+        job.progress = written
+
+    with tempfile.TemporaryFile() as output:
+        write_xlsx(output, spec.title, spec.headers, tracked(spec.rows(queryset)))
+        output.seek(0)
+        job.file.save(spec.filename, File(output), save=False)
@@ -0,0 +1,64 @@
+import os
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from .models import Order
+
+
+FORMAT_EXTENSIONS = {"WEBP": "webp", "JPEG": "jpg"}
+
+
+def compress_image(fileobj, max_size, quality=None, image_format=None):
+    """Re-encode an image to fit in ``max_size`` pixels square, upright and
+    without EXIF or other metadata. Returns the encoded bytes."""
+    quality = quality or settings.PROOF_IMAGE_QUALITY
+    image_format = image_format or settings.PROOF_IMAGE_FORMAT
+    with Image.open(fileobj) as image:
+        # Lets the JPEG decoder downscale while decoding large photos.
+        image.draft("RGB", (max_size, max_size))
+        image = ImageOps.exif_transpose(image)
+        image.thumbnail((max_size, max_size), Image.LANCZOS)
+        if image.mode not in ("RGB", "RGBA") or (image_format == "JPEG" and image.mode != "RGB"):
+            image = image.convert("RGB")
+        output = BytesIO()
+        image.save(output, image_format, quality=quality, optimize=True)
+    return output.getvalue()
+
+
+def optimize_proof_image(order_id):
+    """Replace an order's uploaded proof with a downscaled copy and add its
+    thumbnail. Returns ``(bytes_before, bytes_after)`` or None when there is
+    nothing to do."""
+    order = Order.objects.filter(pk=order_id).only("id", "proof_image", "proof_thumbnail").first()
+    if order is None or not order.proof_image or order.proof_thumbnail:
+        return None
+
+    original = order.proof_image.name
+    storage = order.proof_image.storage
+    with order.proof_image.open("rb") as source:
+        bytes_before = source.size
+        image = compress_image(source, settings.PROOF_IMAGE_MAX_SIZE)
+        source.seek(0)
+        thumbnail = compress_image(source, settings.PROOF_THUMBNAIL_SIZE)
+
+    stem = os.path.splitext(os.path.basename(original))[0]
+    extension = FORMAT_EXTENSIONS[settings.PROOF_IMAGE_FORMAT]
+    order.proof_image.save(f"{stem}.{extension}", ContentFile(image), save=False)
+    order.proof_thumbnail.save(f"{stem}.{extension}", ContentFile(thumbnail), save=False)
+
+    # A plain update: the order may have been edited meanwhile, and the proof
+    # is only swapped if it is still the one that was processed.
+    swapped = Order.objects.filter(pk=order.pk, proof_image=original).update(
+        proof_image=order.proof_image.name,
+        proof_thumbnail=order.proof_thumbnail.name,
+        updated_at=timezone.now(),
+    )
+    if not swapped:
+        storage.delete(order.proof_image.name)
+        storage.delete(order.proof_thumbnail.name)
+        return None
+    storage.delete(original)
+    return bytes_before, len(image) + len(thumbnail)
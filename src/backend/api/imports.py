@@ -0,0 +1,198 @@
+import codecs
+import csv
+import re
+import zipfile
+from datetime import datetime, time
+from django.conf import settings
+from django.db import transaction
+import openpyxl
+from openpyxl.utils.exceptions import InvalidFileException
+from rest_framework import serializers
+
+from .metrics import invalidate_dashboard_metrics
+from .models import Customer, User, delivery_days_to_mask
+from .scheduling import sync_customer_schedules
+from .serializers import CustomerSerializer, resolve_delivery_days
+
+
+# Column names match the customer export headers, so an export can be
+# edited and imported back.
+IMPORT_FIELDS = [
+    "full_name", "driver_username", "phone", "area", "zone_number", "plot_number",
+    "property_type", "account_number", "starting_date", "agreement_without_meter",
+    "weekly_trips", "delivery_days", "delivery_time", "gallons", "filling_stations",
+    "location_link",
+]
+REQUIRED_COLUMNS = {"full_name", "driver_username", "delivery_time"}
+HEADER_ALIASES = {"driver": "driver_username", "name": "full_name"}
+DAY_SEPARATORS = re.compile(r"[,;|/]")
+READ_ERRORS = (ValueError, csv.Error, zipfile.BadZipFile, InvalidFileException)
+
+
+def normalize_header(header):
+    name = re.sub(r"[^a-z0-9]+", "_", str(header or "").strip().lower()).strip("_")
+    return HEADER_ALIASES.get(name, name)
+
+
+def read_rows(fileobj, filename):
+    """Yield the header and then every row of a CSV or XLSX file as a list of
+    cells, without loading the whole file."""
+    if filename.lower().endswith((".xlsx", ".xlsm")):
+        workbook = openpyxl.load_workbook(fileobj, read_only=True, data_only=True)
+        try:
+            yield from workbook.active.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    else:
+        yield from csv.reader(codecs.iterdecode(fileobj, "utf-8-sig"))
+
+
+def cell(value):
+    if isinstance(value, str):
+        return value.strip()
+    if isinstance(value, datetime) and value.time() == time():
+        return value.date()
+    if isinstance(value, float) and value.is_integer():
+        return int(value)
+    return value
+
+
+def row_validator():
+    """Validate one row's cells with CustomerSerializer's own field rules.
+    Drivers come from a single username map instead of a query per row, and
+    full_name is the upsert key rather than a uniqueness check."""
+    fields = CustomerSerializer().fields
+    drivers = dict(User.objects.filter(role="driver").values_list("username", "id"))
+    max_name_length = Customer._meta.get_field("full_name").max_length
+
+    def validate(values):
+        attrs, errors = {}, {}
+        for name, raw in values.items():
+            empty = raw is None or raw == ""
+            if name == "full_name":
+                if empty:
+                    errors[name] = ["This field is required."]
+                elif len(str(raw)) > max_name_length:
+                    errors[name] = [f"Ensure this field has no more than {max_name_length} characters."]
+                else:
+                    attrs[name] = str(raw)
+            elif name == "driver_username":
+                if empty:
+                    errors[name] = ["This field is required."]
+                elif str(raw) not in drivers:
+                    errors[name] = [f"Object with username={raw} does not exist."]
+                else:
+                    attrs["driver_id"] = drivers[str(raw)]
+            else:
+                field = fields[name]
+                if empty:
+                    if field.required:
+                        errors[name] = ["This field is required."]
+                    elif field.allow_null:
+                        attrs[field.source] = None
+                    continue
+                if name == "delivery_days":
+                    raw = [day.strip() for day in DAY_SEPARATORS.split(str(raw)) if day.strip()]
+                try:
+                    attrs[field.source] = field.run_validation(raw)
+                except serializers.ValidationError as exc:
+                    errors[name] = exc.detail
+
+        if not errors and attrs.get("weekly_trips"):
+            try:
+                attrs["delivery_days"] = resolve_delivery_days(attrs["weekly_trips"], attrs.get("delivery_days", []))
+            except serializers.ValidationError as exc:
+                errors["non_field_errors"] = exc.detail
+        return attrs, errors
+
+    return validate
+
+
+def update_fields_for(columns):
+    fields = {"driver" if name == "driver_username" else name for name in columns}
+    if "weekly_trips" in fields:
+        fields.add("delivery_days")
+    if "delivery_days" in fields:
+        fields.add("delivery_weekdays")
+    return sorted(fields - {"full_name"})
+
+
+def write_chunk(chunk, update_fields, report, dry_run):
+    names = [attrs["full_name"] for attrs in chunk]
+    attnames = {Customer._meta.get_field(field).attname for field in update_fields}
+    schedule_fields = [field for field in Customer.SCHEDULE_FIELDS if field in attnames]
+    existing = {
+        row[0]: row[1:]
+        for row in Customer.objects.filter(full_name__in=names).values_list("full_name", *schedule_fields)
+    }
+    report["created"] += len(chunk) - len(existing)
+    report["updated"] += len(existing)
+    if dry_run:
+        return
+
+    customers = []
+    rescheduled = []
+    for attrs in chunk:
+        customer = Customer(**attrs)
+        customer.delivery_weekdays = delivery_days_to_mask(customer.delivery_days)
+        customers.append(customer)
+        schedule = tuple(getattr(customer, field) for field in schedule_fields)
+        if existing.get(customer.full_name) != schedule:
+            rescheduled.append(customer.full_name)
+
+    # bulk_create skips Customer.save(), so the weekday mask above and the
+    # schedule sync below are done here.
+    with transaction.atomic():
+        Customer.objects.bulk_create(
+            customers, update_conflicts=True, unique_fields=["full_name"], update_fields=update_fields
+        )
+        if rescheduled:
+            sync_customer_schedules(list(Customer.objects.filter(full_name__in=rescheduled).values_list("id", flat=True)))
+
+
+def import_customers(fileobj, filename, dry_run=False, chunk_size=None):
+    """Create or update customers (matched on full_name) from a CSV or XLSX
+    file in chunks. Invalid rows are skipped and listed in the returned
+    report with their row number and errors."""
+    chunk_size = chunk_size or settings.CUSTOMER_IMPORT_CHUNK_SIZE
+    report = {"rows": 0, "created": 0, "updated": 0, "errors": []}
+    row_number = 1
+    try:
+        rows = read_rows(fileobj, filename)
+        header = next(rows, None)
+        if header is None:
+            report["errors"].append({"row": 1, "errors": {"file": ["The file is empty."]}})
+            return report
+        columns = [(index, name) for index, name in enumerate(map(normalize_header, header)) if name in IMPORT_FIELDS]
+        missing = REQUIRED_COLUMNS - {name for _, name in columns}
+        if missing:
+            report["errors"].append({"row": 1, "errors": {name: ["Column is required."] for name in sorted(missing)}})
+            return report
+
+        update_fields = update_fields_for(name for _, name in columns)
+        validate = row_validator()
+        seen = {}
+        chunk = []
+        for row_number, row in enumerate(rows, start=2):
+            if all(value is None or value == "" for value in row):
+                continue
+            report["rows"] += 1
+            attrs, errors = validate({name: cell(row[index]) if index < len(row) else None for index, name in columns})
+            if not errors and attrs["full_name"] in seen:
+                errors = {"full_name": [f"Duplicate of row {seen[attrs['full_name']]}."]}
+            if errors:
+                report["errors"].append({"row": row_number, "errors": errors})
+                continue
+            seen[attrs["full_name"]] = row_number
+            chunk.append(attrs)
+            if len(chunk) >= chunk_size:
+                write_chunk(chunk, update_fields, report, dry_run)
+                chunk = []
+        if chunk:
+            write_chunk(chunk, update_fields, report, dry_run)
+    except READ_ERRORS as exc:
+        report["errors"].append({"row": row_number, "errors": {"file": [f"Could not read the file: {exc}"]}})
+    finally:
+        if not dry_run and (report["created"] or report["updated"]):
+            invalidate_dashboard_metrics()
+    return report
@@ -0,0 +1,217 @@
+import multiprocessing
+import os
+import threading
+import zipfile
+from collections import deque
+from io import BytesIO
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from django.conf import settings
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfgen import canvas
+
+
+# Bump when the layout changes so cached invoice PDFs are rendered again.
+TEMPLATE_VERSION = 1
+
+# The labels every invoice page shares are drawn once per document as a
+# form and stamped onto each page.
+PAGE_TEMPLATE = "invoice_page"
+CONTEXT_FIELDS = {
+    "id": "id",
+    "customer_name": "recheck__customer__full_name",
+    "phone": "recheck__customer__phone",
+    "area": "recheck__customer__area",
+    "account_number": "recheck__customer__account_number",
+    "period_start": "recheck__period_start",
+    "period_end": "recheck__period_end",
+    "total_trips": "recheck__total_trips",
+    "total_gallons": "recheck__total_gallons",
+    "price_per_gallon": "price_per_gallon",
+    "subtotal": "subtotal",
+    "vat_percent": "vat_percent",
+    "vat_amount": "vat_amount",
+    "total": "total",
+    "notes": "notes",
+}
+
+
+def invoice_context(final):
+    recheck = final.recheck
+    customer = recheck.customer
+    return {
+        "id": final.id,
+        "customer_name": customer.full_name,
+        "phone": customer.phone,
+        "area": customer.area,
+        "account_number": customer.account_number,
+        "period_start": recheck.period_start,
+        "period_end": recheck.period_end,
+        "total_trips": recheck.total_trips,
+        "total_gallons": recheck.total_gallons,
+        "price_per_gallon": final.price_per_gallon,
+        "subtotal": final.subtotal,
+        "vat_percent": final.vat_percent,
+        "vat_amount": final.vat_amount,
+        "total": final.total,
+        "notes": final.notes,
+    }
+
+
+def invoice_contexts(queryset):
+    """Everything the renderer needs for many invoices, from one query and
+    as plain values that can be sent to worker processes."""
+    rows = queryset.values(*CONTEXT_FIELDS.values())
+    return [{key: row[field] for key, field in CONTEXT_FIELDS.items()} for row in rows]
+
+
+def define_page_template(p):
+    p.beginForm(PAGE_TEMPLATE)
+    p.setFont("Helvetica-Bold", 10)
+    y = A4[1] - 50 - 80
+    p.drawString(50, y, "Period")
+    p.drawString(150, y, "Trips")
+    p.drawString(230, y, "Gallons")
+    p.drawString(330, y, "Price/gal")
+    p.drawString(430, y, "Line Total")
+    p.setFont("Helvetica", 10)
+    p.drawString(330, y - 45, "Subtotal:")
+    p.setFont("Helvetica-Bold", 11)
+    p.drawString(330, y - 75, "TOTAL:")
+    p.endForm()
+
+
+def draw_invoice(p, invoice):
+    width, height = A4
+    y = height - 50
+
+    p.doForm(PAGE_TEMPLATE)
+    p.setFont("Helvetica-Bold", 14)
+    # Header
+    p.drawString(50, y, f"Invoice #{invoice['id']}")
+    y -= 25
+    p.setFont("Helvetica", 10)
+    p.drawString(50, y, f"Customer: {invoice['customer_name']}")
+    y -= 15
+    p.drawString(50, y, f"Phone: {invoice['phone'] or ''}")
+    y -= 15
+    p.drawString(50, y, f"Area: {invoice['area'] or ''}")
+    y -= 25
+
+    # Table-like lines, under the template's column labels
+    y -= 15
+    period_str = f"{invoice['period_start'].strftime('%d/%m/%Y')} → {invoice['period_end'].strftime('%d/%m/%Y')}"
+    p.drawString(50, y, period_str)
+    p.drawString(150, y, str(invoice["total_trips"]))
+    p.drawString(230, y, str(invoice["total_gallons"]))
+    p.drawString(330, y, f"{invoice['price_per_gallon']:.2f}")
+    p.drawString(430, y, f"{invoice['subtotal']:.2f}")
+    y -= 30
+
+    # Summary
+    p.drawString(430, y, f"{invoice['subtotal']:.2f}")
+    y -= 15
+    p.drawString(330, y, f"VAT ({invoice['vat_percent']}%):")
+    p.drawString(430, y, f"{invoice['vat_amount']:.2f}")
+    y -= 15
+    p.setFont("Helvetica-Bold", 11)
+    p.drawString(430, y, f"{invoice['total']:.2f}")
+    y -= 30
+
+    if invoice["notes"]:
+        p.setFont("Helvetica", 9)
+        p.drawString(50, y, f"Notes: {invoice['notes']}")
+        y -= 15
+
+    p.showPage()
+
+
+def render_document(invoices, fileobj):
+    """Draw the invoices as consecutive pages of one PDF written to ``fileobj``."""
+    p = canvas.Canvas(fileobj, pagesize=A4)
+    define_page_template(p)
+    for invoice in invoices:
+        draw_invoice(p, invoice)
+    p.save()
+
+
+def render_invoice_pdf(final):
+    buffer = BytesIO()
+    render_document([invoice_context(final)], buffer)
+    return buffer.getvalue()
+
+
+def render_separately(invoices):
+    files = []
+    for invoice in invoices:
+        buffer = BytesIO()
+        render_document([invoice], buffer)
+        files.append((f"invoice_{invoice['id']}.pdf", buffer.getvalue()))
+    return files
+
+
+def pool_size():
+    # Celery's prefork children are daemonic and can't start processes.
+    if multiprocessing.current_process().daemon:
+        return 1
+    return settings.INVOICE_PDF_WORKERS or os.cpu_count() or 1
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def shared_pool():
+    """The process's one rendering pool, started on first use and reused by
+    every batch. Workers come from a fork server rather than from the
+    (threaded) web worker itself."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=pool_size(), mp_context=multiprocessing.get_context("forkserver")
+            )
+        return _pool
+
+
+def discard_pool():
+    global _pool
+    with _pool_lock:
+        _pool = None
+
+
+def pooled(function, items, window):
+    # Keeps at most ``window`` items of this batch queued on the shared pool,
+    # so one large request can't take every worker; results stay in order.
+    pool = shared_pool()
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(pool.submit(function, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    except BrokenProcessPool:
+        discard_pool()
+        raise
+
+
+def render_zip(invoices, fileobj, workers=None):
+    """Write one PDF per invoice into a ZIP at ``fileobj``. Chunks of
+    invoices are rendered on the shared process pool, at most ``workers``
+    (default INVOICE_PDF_REQUEST_WORKERS) at a time, and added in order."""
+    size = settings.INVOICE_PDF_CHUNK_SIZE
+    chunks = [invoices[start:start + size] for start in range(0, len(invoices), size)]
+    workers = min(workers or settings.INVOICE_PDF_REQUEST_WORKERS, pool_size(), len(chunks))
+    with zipfile.ZipFile(fileobj, "w", zipfile.ZIP_DEFLATED) as archive:
+        if workers <= 1:
+            write_files(archive, map(render_separately, chunks))
+        else:
+            write_files(archive, pooled(render_separately, chunks, workers))
+
+
+def write_files(archive, rendered_chunks):
+    for files in rendered_chunks:
+        for name, content in files:
+            archive.writestr(name, content)
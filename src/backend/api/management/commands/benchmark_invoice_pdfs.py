@@ -0,0 +1,67 @@
+import os
+import tempfile
+import time
+from datetime import date
+from decimal import Decimal
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from api.invoice_pdf import pool_size, render_document, render_separately, render_zip
+from api.models import invoice_totals
+
+
+def sample_invoices(count):
+    invoices = []
+    for index in range(count):
+        gallons = 800 + index % 400
+        subtotal, vat_amount, total = invoice_totals(gallons, Decimal("0.35"), Decimal("5.00"))
+        invoices.append({
+            "id": index + 1,
+            "customer_name": f"Customer {index}",
+            "phone": f"0500{index:06d}",
+            "area": "North",
+            "period_start": date(2026, 9, 1),
+            "period_end": date(2026, 9, 30),
+            "total_trips": 12,
+            "total_gallons": gallons,
+            "price_per_gallon": Decimal("0.35"),
+            "subtotal": subtotal,
+            "vat_percent": Decimal("5.00"),
+            "vat_amount": vat_amount,
+            "total": total,
+            "notes": "Monthly delivery" if index % 3 == 0 else "",
+        })
+    return invoices
+
+
+class Command(BaseCommand):
+    help = "Measure invoice PDF rendering throughput (invoices per second, per core) on synthetic invoices."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=500)
+        parser.add_argument("--workers", type=int, default=None, help="Defaults to the shared pool's size.")
+
+    def handle(self, *args, **options):
+        invoices = sample_invoices(options["count"])
+        # The shared pool (INVOICE_PDF_WORKERS) caps what one batch can use.
+        workers = min(options["workers"] or pool_size(), pool_size())
+
+        def measure(label, cores, render):
+            with tempfile.TemporaryFile() as output:
+                started = time.perf_counter()
+                render(output)
+                elapsed = time.perf_counter() - started
+                size = output.tell()
+            rate = len(invoices) / elapsed
+            self.stdout.write(
+                f"{label:<34} {elapsed:7.2f}s {rate:8.1f} inv/s {rate / cores:8.1f} inv/s/core {size / 1024:9.0f} KiB"
+            )
+
+        self.stdout.write(f"{len(invoices)} invoices, {workers} workers, {os.cpu_count()} CPUs")
+        measure("one request per invoice", 1, lambda output: [output.write(pdf) for invoice in invoices for _, pdf in render_separately([invoice])])
+        measure("merged PDF", 1, lambda output: render_document(invoices, output))
+        measure("ZIP, 1 process", 1, lambda output: render_zip(invoices, output, workers=1))
+        # The first pooled batch starts the pool; time the warm one.
+        with tempfile.TemporaryFile() as output:
+            render_zip(invoices[:settings.INVOICE_PDF_CHUNK_SIZE * workers], output, workers=workers)
+        measure(f"ZIP, {workers} processes", workers, lambda output: render_zip(invoices, output, workers=workers))
@@ -0,0 +1,72 @@
+import statistics
+import tempfile
+import time
+from io import BytesIO
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+from django.core.management.base import BaseCommand
+from PIL import Image
+
+from api.images import compress_image
+
+
+def phone_photo(width, height, seed):
+    """A noisy, EXIF-tagged JPEG about the size a phone camera produces."""
+    noise = [Image.effect_noise((width, height), 40 + seed * 7 + channel) for channel in range(3)]
+    image = Image.merge("RGB", noise)
+    exif = Image.Exif()
+    exif[0x0112] = 6  # orientation: rotated 90°
+    exif[0x010F] = "Benchmark Phone"
+    output = BytesIO()
+    image.save(output, "JPEG", quality=92, exif=exif)
+    return output.getvalue()
+
+
+class Command(BaseCommand):
+    help = "Measure bytes stored and request-path time for proof photos, raw vs processed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--count", type=int, default=5, help="Number of synthetic photos.")
+        parser.add_argument("--width", type=int, default=4032)
+        parser.add_argument("--height", type=int, default=3024)
+
+    def handle(self, *args, **options):
+        photos = [phone_photo(options["width"], options["height"], seed) for seed in range(options["count"])]
+        store_ms, inline_ms, process_ms = [], [], []
+        bytes_raw = bytes_processed = bytes_thumbnails = 0
+
+        with tempfile.TemporaryDirectory() as root:
+            storage = FileSystemStorage(location=root)
+            for index, photo in enumerate(photos):
+                # Confirm now: store the upload as is and queue the processing.
+                started = time.perf_counter()
+                name = storage.save(f"raw_{index}.jpg", ContentFile(photo))
+                store_ms.append((time.perf_counter() - started) * 1000)
+
+                # What the worker does afterwards, and what confirm would cost
+                # if it processed the photo inline.
+                started = time.perf_counter()
+                with storage.open(name, "rb") as source:
+                    image = compress_image(source, settings.PROOF_IMAGE_MAX_SIZE)
+                    source.seek(0)
+                    thumbnail = compress_image(source, settings.PROOF_THUMBNAIL_SIZE)
+                storage.save(f"proof_{index}", ContentFile(image))
+                storage.save(f"thumb_{index}", ContentFile(thumbnail))
+                process_ms.append((time.perf_counter() - started) * 1000)
+                inline_ms.append(store_ms[-1] + process_ms[-1])
+
+                bytes_raw += len(photo)
+                bytes_processed += len(image)
+                bytes_thumbnails += len(thumbnail)
+
+        count = len(photos)
+        self.stdout.write(f"{count} photos of {options['width']}x{options['height']}, "
+                          f"{settings.PROOF_IMAGE_FORMAT} q{settings.PROOF_IMAGE_QUALITY}, "
+                          f"max {settings.PROOF_IMAGE_MAX_SIZE}px, thumbnail {settings.PROOF_THUMBNAIL_SIZE}px")
+        self.stdout.write(f"bytes stored per photo: raw {bytes_raw // count:,} → "
+                          f"processed {bytes_processed // count:,} + thumbnail {bytes_thumbnails // count:,} "
+                          f"({(bytes_processed + bytes_thumbnails) / bytes_raw:.1%} of raw)")
+        self.stdout.write(f"confirm latency (median): raw store {statistics.median(store_ms):.1f} ms, "
+                          f"inline processing {statistics.median(inline_ms):.1f} ms")
+        self.stdout.write(f"background processing (median): {statistics.median(process_ms):.1f} ms per photo")
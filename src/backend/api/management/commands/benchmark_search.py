@@ -0,0 +1,115 @@
+import random
+import statistics
+import time
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.utils import timezone
+from rest_framework import filters
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from api.models import Customer, Order, User
+from api.views.customers import CustomerViewSet
+from api.views.orders import OrderViewSet
+
+
+FIRST_NAMES = ["Ahmed", "Fatima", "Omar", "Layla", "Yousef", "Mariam", "Khalid", "Noura", "Hassan", "Aisha"]
+LAST_NAMES = ["Al Mansoori", "Haddad", "Qasim", "Saleh", "Nasser", "Khoury", "Farouk", "Rahman", "Aziz", "Hamdan"]
+AREAS = ["North", "South", "East", "West", "Central"]
+
+
+def unindexed(view_class):
+    # The same view with DRF's plain SearchFilter, i.e. icontains scans.
+    return type(f"Unindexed{view_class.__name__}", (view_class,), {
+        "filter_backends": [
+            filters.SearchFilter if backend.__name__ == "IndexedSearchFilter" else backend
+            for backend in view_class.filter_backends
+        ],
+    })
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed customers and orders inside a transaction that is rolled back, then "
+        "measure search latency through the indexed and plain search filters."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--customers", type=int, default=100_000)
+        parser.add_argument("--orders-per-customer", type=int, default=10)
+        parser.add_argument("--repeat", type=int, default=20, help="Requests timed per search term.")
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            admin, drivers = self.seed(options["customers"], options["orders_per_customer"])
+            self.measure(admin, drivers, options["repeat"])
+            transaction.set_rollback(True)
+
+    def seed(self, customer_count, orders_per_customer):
+        random.seed(7)
+        started = time.perf_counter()
+        admin = User.objects.create_user("benchmark-admin", role="admin")
+        drivers = User.objects.bulk_create([User(username=f"benchmark-driver-{index}", role="driver") for index in range(50)])
+
+        customers = []
+        for index in range(customer_count):
+            customers.append(Customer(
+                full_name=f"{random.choice(FIRST_NAMES)} {random.choice(LAST_NAMES)} {index}",
+                phone=f"05{index:08d}",
+                area=random.choice(AREAS),
+                location_link=f"https://maps.example.com/?q={random.random():.6f},{random.random():.6f}",
+                driver=random.choice(drivers),
+            ))
+        customers = Customer.objects.bulk_create(customers, batch_size=5000)
+
+        today = timezone.localdate()
+        batch = []
+        for customer in customers:
+            for offset in range(orders_per_customer):
+                day = today - timedelta(days=offset)
+                batch.append(Order(
+                    customer=customer,
+                    driver=customer.driver,
+                    delivery_date=day,
+                    required_gallons=500,
+                    status="confirmed" if offset else "pending",
+                ))
+            if len(batch) >= 10_000:
+                Order.objects.bulk_create(batch)
+                batch = []
+        if batch:
+            Order.objects.bulk_create(batch)
+
+        if connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("ANALYZE api_customer; ANALYZE api_order; ANALYZE api_user")
+        self.stdout.write(
+            f"seeded {customer_count} customers and {customer_count * orders_per_customer} orders "
+            f"in {time.perf_counter() - started:.1f}s ({connection.vendor})"
+        )
+        return admin, drivers
+
+    def measure(self, admin, drivers, repeat):
+        factory = APIRequestFactory()
+        searches = [
+            (CustomerViewSet, "/api/customers/", "Khoury 4242"),
+            (CustomerViewSet, "/api/customers/", "0500012"),
+            (OrderViewSet, "/api/orders/", "Farouk 777"),
+            (OrderViewSet, "/api/orders/", drivers[7].username),
+        ]
+        self.stdout.write(f"{'endpoint':<18} {'term':<22} {'indexed p50/p95 ms':>20} {'plain p50/p95 ms':>20}")
+        for view_class, url, term in searches:
+            timings = []
+            for candidate in (view_class, unindexed(view_class)):
+                view = candidate.as_view({"get": "list"})
+                samples = []
+                for _ in range(repeat):
+                    request = factory.get(url, {"search": term, "count": "false"})
+                    force_authenticate(request, admin)
+                    started = time.perf_counter()
+                    response = view(request)
+                    response.render()
+                    samples.append((time.perf_counter() - started) * 1000)
+                samples.sort()
+                timings.append(f"{statistics.median(samples):8.1f}/{samples[int(len(samples) * 0.95) - 1]:<8.1f}")
+            self.stdout.write(f"{url:<18} {term:<22} {timings[0]:>20} {timings[1]:>20}")
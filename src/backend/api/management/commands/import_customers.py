@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from api.imports import import_customers
+
+
+class Command(BaseCommand):
+    help = "Create or update customers from a CSV or XLSX file, matched on full name."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV or XLSX file with the customer export columns.")
+        parser.add_argument("--dry-run", action="store_true", help="Validate only, write nothing.")
+        parser.add_argument("--chunk-size", type=int, default=None, help="Rows per insert batch.")
+
+    def handle(self, *args, **options):
+        try:
+            fileobj = open(options["path"], "rb")
+        except OSError as exc:
+            raise CommandError(exc)
+        with fileobj:
+            report = import_customers(fileobj, options["path"], options["dry_run"], options["chunk_size"])
+
+        for error in report["errors"]:
+            details = "; ".join(
+                f"{field}: {' '.join(map(str, messages)) if isinstance(messages, list) else messages}"
+                for field, messages in error["errors"].items()
+            )
+            self.stderr.write(f"row {error['row']}: {details}")
+        action = "would be" if options["dry_run"] else "were"
+        self.stdout.write(self.style.SUCCESS(
+            f"{report['rows']} rows read: {report['created']} customers {action} created, "
+            f"{report['updated']} {action} updated, {len(report['errors'])} rows rejected"
+        ))
@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils.dateparse import parse_date
+
+from api.scheduling import materialize_orders
+
+
+class Command(BaseCommand):
+    help = "Create pending orders for every scheduled delivery in the coming days."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=settings.ORDER_SCHEDULE_HORIZON_DAYS)
+        parser.add_argument("--start", type=parse_date, default=None, help="First day (YYYY-MM-DD), defaults to today.")
+        parser.add_argument("--chunk-size", type=int, default=settings.ORDER_SCHEDULE_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        scanned, created = materialize_orders(
+            start=options["start"], days=options["days"], chunk_size=options["chunk_size"]
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"{created} orders created over {options['days']} days ({scanned} customer-days scanned)"
+        ))
@@ -0,0 +1,63 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Max, Sum
+from django.utils import timezone
+
+from api.models import CustomerLedger, FinalInvoice, RecheckInvoice
+
+
+LEDGER_FIELDS = ["invoiced", "invoice_count", "period_count", "gallons", "last_invoice_at"]
+
+
+class Command(BaseCommand):
+    help = "Recompute customer ledgers from rechecks and final invoices and compare them with the running totals."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Overwrite ledgers that don't match the recount.")
+
+    def handle(self, *args, **options):
+        expected = {}
+        rechecks = RecheckInvoice.objects.values("customer_id").annotate(periods=Count("id"), gallons=Sum("total_gallons"))
+        for row in rechecks.iterator():
+            expected[row["customer_id"]] = CustomerLedger(
+                customer_id=row["customer_id"], period_count=row["periods"], gallons=row["gallons"] or 0
+            )
+        invoices = FinalInvoice.objects.values("recheck__customer_id").annotate(
+            invoiced=Sum("total"), invoices=Count("id"), last=Max("finalized_at")
+        )
+        for row in invoices.iterator():
+            ledger = expected[row["recheck__customer_id"]]
+            ledger.invoiced = row["invoiced"] or 0
+            ledger.invoice_count = row["invoices"]
+            ledger.last_invoice_at = row["last"]
+
+        ledgers = {ledger.customer_id: ledger for ledger in CustomerLedger.objects.all().iterator()}
+
+        now = timezone.now()
+        stale = []
+        missing = []
+        for customer_id in expected.keys() | ledgers.keys():
+            wanted = expected.get(customer_id) or CustomerLedger(customer_id=customer_id)
+            ledger = ledgers.get(customer_id)
+            if ledger is None:
+                missing.append(wanted)
+                self.stdout.write(f"customer {customer_id}: missing (expected {wanted.invoiced} invoiced, {wanted.gallons} gal)")
+                continue
+            differing = [field for field in LEDGER_FIELDS if getattr(ledger, field) != getattr(wanted, field)]
+            if differing:
+                self.stdout.write(f"customer {customer_id}: " + ", ".join(
+                    f"{field} {getattr(ledger, field)} expected {getattr(wanted, field)}" for field in differing
+                ))
+                wanted.updated_at = now
+                stale.append(wanted)
+
+        if options["fix"] and (stale or missing):
+            with transaction.atomic():
+                CustomerLedger.objects.bulk_update(stale, LEDGER_FIELDS + ["updated_at"], batch_size=1000)
+                CustomerLedger.objects.bulk_create(missing, batch_size=1000)
+
+        summary = f"{len(ledgers)} ledgers checked, {len(stale)} mismatched, {len(missing)} missing"
+        if options["fix"]:
+            summary += " (fixed)"
+        style = self.style.SUCCESS if not (stale or missing) or options["fix"] else self.style.WARNING
+        self.stdout.write(style(summary))
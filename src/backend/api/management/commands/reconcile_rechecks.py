@@ -0,0 +1,107 @@
+from collections import defaultdict
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
+
+from api.models import Customer, Order, RecheckAccumulator, RecheckInvoice, recheck_period
+
+
+class Command(BaseCommand):
+    help = (
+        "Recount confirmed orders per recheck period and compare them with the running "
+        "accumulators and with the draft rechecks that still take late confirmations."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fix", action="store_true", help="Overwrite accumulators and drafts that don't match the recount.")
+
+    def handle(self, *args, **options):
+        starting_dates = dict(
+            Customer.objects.exclude(starting_date__isnull=True).values_list("id", "starting_date")
+        )
+        daily_totals = (
+            Order.objects.filter(status="confirmed")
+            .annotate(day=Coalesce("delivery_date", TruncDate("created_at")))
+            .values("customer_id", "day")
+            .annotate(trips=Count("id"), gallons=Sum("filled_amount"))
+            .values_list("customer_id", "day", "trips", "gallons")
+        )
+
+        expected = defaultdict(lambda: [0, 0])
+        period_ends = {}
+        for customer_id, day, trips, gallons in daily_totals.iterator():
+            period = recheck_period(starting_dates.get(customer_id), day)
+            if period is None:
+                continue
+            key = (customer_id, period[0])
+            period_ends[key] = period[1]
+            expected[key][0] += trips
+            expected[key][1] += gallons or 0
+
+        accumulators = {
+            (a.customer_id, a.period_start): a
+            for a in RecheckAccumulator.objects.all().iterator()
+        }
+
+        stale = []
+        missing = []
+        for key in expected.keys() | accumulators.keys():
+            trips, gallons = expected.get(key, (0, 0))
+            accumulator = accumulators.get(key)
+            if accumulator is None:
+                missing.append(RecheckAccumulator(
+                    customer_id=key[0],
+                    period_start=key[1],
+                    period_end=period_ends[key],
+                    total_trips=trips,
+                    total_gallons=gallons,
+                ))
+                self.stdout.write(f"customer {key[0]} period {key[1]}: missing (expected {trips} trips, {gallons} gal)")
+            elif (accumulator.total_trips, accumulator.total_gallons) != (trips, gallons):
+                self.stdout.write(
+                    f"customer {key[0]} period {key[1]}: "
+                    f"{accumulator.total_trips} trips / {accumulator.total_gallons} gal, "
+                    f"expected {trips} / {gallons}"
+                )
+                accumulator.total_trips = trips
+                accumulator.total_gallons = gallons
+                stale.append(accumulator)
+
+        # Drafts are recounted over their own range, which need not line up
+        # with an accumulator period.
+        drafts = list(
+            RecheckInvoice.objects.filter(status="draft", period_start__isnull=False, period_end__isnull=False)
+            .only("id", "customer_id", "period_start", "period_end", "total_trips", "total_gallons")
+        )
+        recounted = RecheckAccumulator.recount(
+            (draft.customer_id, draft.period_start, draft.period_end) for draft in drafts
+        )
+        stale_drafts = []
+        for draft in drafts:
+            trips, gallons = recounted[draft.customer_id, draft.period_start, draft.period_end]
+            if (draft.total_trips, draft.total_gallons) != (trips, gallons):
+                self.stdout.write(
+                    f"draft recheck {draft.pk} ({draft.period_start} → {draft.period_end}): "
+                    f"{draft.total_trips} trips / {draft.total_gallons} gal, expected {trips} / {gallons}"
+                )
+                draft.total_trips = trips
+                draft.total_gallons = gallons
+                stale_drafts.append(draft)
+
+        if options["fix"] and (stale or missing or stale_drafts):
+            with transaction.atomic():
+                RecheckAccumulator.objects.bulk_update(stale, ["total_trips", "total_gallons"], batch_size=1000)
+                RecheckAccumulator.objects.bulk_create(missing, batch_size=1000)
+                for draft in stale_drafts:
+                    # save() moves the gallons difference onto the ledger.
+                    draft.save(update_fields=["total_trips", "total_gallons"])
+
+        summary = (
+            f"{len(accumulators)} accumulators checked, {len(stale)} mismatched, {len(missing)} missing; "
+            f"{len(drafts)} drafts checked, {len(stale_drafts)} mismatched"
+        )
+        if options["fix"]:
+            summary += " (fixed)"
+        style = self.style.SUCCESS if not (stale or missing or stale_drafts) or options["fix"] else self.style.WARNING
+        self.stdout.write(style(summary))
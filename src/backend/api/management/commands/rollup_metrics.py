@@ -0,0 +1,21 @@
+from datetime import timedelta
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from api.metrics import rollup_daily_metrics
+
+
+class Command(BaseCommand):
+    help = "Rebuild the DailyMetrics rollup rows for a range of days."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, default=90, help="Number of days ending today (ignored with --start).")
+        parser.add_argument("--start", type=parse_date, default=None, help="First day (YYYY-MM-DD).")
+        parser.add_argument("--end", type=parse_date, default=None, help="Last day (YYYY-MM-DD), defaults to today.")
+
+    def handle(self, *args, **options):
+        end = options["end"] or timezone.localdate()
+        start = options["start"] or end - timedelta(days=options["days"] - 1)
+        rows = rollup_daily_metrics(start, end)
+        self.stdout.write(self.style.SUCCESS(f"{rows} daily metric rows written for {start} → {end}"))
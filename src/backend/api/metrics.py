@@ -0,0 +1,199 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Avg, Count, Q, Sum
+from django.db.models.functions import Coalesce, TruncDate
+from django.utils import timezone
+
+from .models import Customer, Complaint, Order, FinalInvoice, DailyMetrics
+
+
+DASHBOARD_CACHE_KEY = "dashboard:metrics"
+
+
+def start_of_day(day):
+    # Timestamp range bounds instead of __date lookups keep the filters
+    # sargable, so the created_at/finalized_at indexes can be used.
+    return timezone.make_aware(datetime.combine(day, datetime.min.time()))
+
+
+def timestamp_range(field, first_day, last_day):
+    return {
+        f"{field}__gte": start_of_day(first_day),
+        f"{field}__lt": start_of_day(last_day + timedelta(days=1)),
+    }
+
+
+def orders_on_days(first_day, last_day):
+    # An order belongs to its delivery day; ad-hoc orders without one fall
+    # back to the day they were created.
+    return Order.objects.filter(
+        Q(delivery_date__gte=first_day, delivery_date__lte=last_day)
+        | Q(delivery_date__isnull=True, **timestamp_range("created_at", first_day, last_day))
+    ).annotate(day=Coalesce("delivery_date", TruncDate("created_at")))
+
+
+def compute_dashboard_metrics():
+    today = timezone.localdate()
+    today_start = start_of_day(today)
+    today_end = today_start + timedelta(days=1)
+
+    orders = Order.objects.aggregate(
+        total=Count("id"),
+        pending=Count("id", filter=Q(status="pending")),
+        today=Count("id", filter=Q(delivery_date=today) | Q(
+            delivery_date__isnull=True, created_at__gte=today_start, created_at__lt=today_end
+        )),
+    )
+    invoices = FinalInvoice.objects.aggregate(
+        revenue=Sum("total"),
+        today_revenue=Sum("total", filter=Q(finalized_at__gte=today_start, finalized_at__lt=today_end)),
+        avg_value=Avg("total"),
+        overdue=Count("id", filter=Q(finalized_at__lt=timezone.now() - timedelta(days=30))),
+    )
+
+    return {
+        "orders_total": orders["total"],
+        "orders_pending": orders["pending"],
+        "orders_today": orders["today"],
+        "revenue_total": invoices["revenue"] or 0,
+        "revenue_today": invoices["today_revenue"] or 0,
+        "invoice_avg_value": invoices["avg_value"] or 0,
+        "invoices_overdue": invoices["overdue"],
+        "customers_total": Customer.objects.count(),
+        "complaints_new": Complaint.objects.filter(status="new").count(),
+        "generated_at": timezone.now(),
+    }
+
+
+def dashboard_metrics():
+    metrics = cache.get(DASHBOARD_CACHE_KEY)
+    if metrics is None:
+        metrics = compute_dashboard_metrics()
+        cache.set(DASHBOARD_CACHE_KEY, metrics, settings.DASHBOARD_CACHE_TTL)
+    return metrics
+
+
+def invalidate_dashboard_metrics():
+    cache.delete(DASHBOARD_CACHE_KEY)
+
+
+METRIC_FIELDS = [
+    "orders_total", "orders_pending", "orders_confirmed", "orders_completed",
+    "orders_canceled", "orders_problem", "gallons_filled", "invoices_count",
+    "revenue", "complaints",
+]
+
+
+def compute_daily_metrics(first_day, last_day):
+    """Aggregate the source tables into one DailyMetrics row per day.
+
+    One grouped query per table over the range; rows are not saved.
+    """
+    days = {}
+
+    def row(day):
+        if day not in days:
+            days[day] = DailyMetrics(date=day)
+        return days[day]
+
+    orders = (
+        orders_on_days(first_day, last_day)
+        .values("day")
+        .annotate(
+            total=Count("id"),
+            pending=Count("id", filter=Q(status="pending")),
+            confirmed=Count("id", filter=Q(status="confirmed")),
+            completed=Count("id", filter=Q(status="completed")),
+            canceled=Count("id", filter=Q(status="canceled")),
+            problem=Count("id", filter=Q(status="problem")),
+            gallons=Sum("filled_amount", filter=Q(status__in=["confirmed", "completed"])),
+        )
+    )
+    for values in orders:
+        metrics = row(values["day"])
+        metrics.orders_total = values["total"]
+        metrics.orders_pending = values["pending"]
+        metrics.orders_confirmed = values["confirmed"]
+        metrics.orders_completed = values["completed"]
+        metrics.orders_canceled = values["canceled"]
+        metrics.orders_problem = values["problem"]
+        metrics.gallons_filled = values["gallons"] or 0
+
+    invoices = (
+        FinalInvoice.objects.filter(**timestamp_range("finalized_at", first_day, last_day))
+        .annotate(day=TruncDate("finalized_at"))
+        .values("day")
+        .annotate(count=Count("id"), total=Sum("total"))
+    )
+    for values in invoices:
+        metrics = row(values["day"])
+        metrics.invoices_count = values["count"]
+        metrics.revenue = values["total"] or 0
+
+    complaints = (
+        Complaint.objects.filter(**timestamp_range("created_at", first_day, last_day))
+        .annotate(day=TruncDate("created_at"))
+        .values("day")
+        .annotate(count=Count("id"))
+    )
+    for values in complaints:
+        row(values["day"]).complaints = values["count"]
+
+    return [days[day] for day in sorted(days)]
+
+
+def days_between(first_day, last_day):
+    return [first_day + timedelta(days=offset) for offset in range((last_day - first_day).days + 1)]
+
+
+def rollup_daily_metrics(first_day, last_day):
+    # Quiet days get a zero row, so a stored rollup covers its whole range
+    # and a missing row always means "not rolled up yet".
+    computed = {metrics.date: metrics for metrics in compute_daily_metrics(first_day, last_day)}
+    rows = [computed.get(day) or DailyMetrics(date=day) for day in days_between(first_day, last_day)]
+    DailyMetrics.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["date"],
+        update_fields=METRIC_FIELDS + ["updated_at"],
+        batch_size=500,
+    )
+    return len(rows)
+
+
+def daily_series(first_day, last_day):
+    """Daily metrics for the range: stored rollups for past days, today live.
+
+    Past days without a stored row (e.g. older than the nightly rollup right
+    after a deploy) are rolled up on the spot, so the next read finds them.
+    """
+    today = timezone.localdate()
+    last_past_day = min(last_day, today - timedelta(days=1))
+    rows = list(DailyMetrics.objects.filter(date__gte=first_day, date__lte=last_past_day))
+    stored = {metrics.date for metrics in rows}
+    missing = [day for day in days_between(first_day, last_past_day) if day not in stored]
+    if missing:
+        rollup_daily_metrics(missing[0], missing[-1])
+        rows = list(DailyMetrics.objects.filter(date__gte=first_day, date__lte=last_past_day))
+    if first_day <= today <= last_day:
+        rows += compute_daily_metrics(today, today)
+    return rows
+
+
+def bucket_start(day, granularity):
+    if granularity == "week":
+        return day - timedelta(days=day.weekday())
+    if granularity == "month":
+        return day.replace(day=1)
+    return day
+
+
+def chart_series(first_day, last_day, granularity="day"):
+    buckets = {}
+    for metrics in daily_series(first_day, last_day):
+        start = bucket_start(metrics.date, granularity)
+        bucket = buckets.setdefault(start, dict.fromkeys(METRIC_FIELDS, 0))
+        for field in METRIC_FIELDS:
+            bucket[field] += getattr(metrics, field)
+    return [{"day": start, **buckets[start]} for start in sorted(buckets)]
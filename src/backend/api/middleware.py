@@ -0,0 +1,28 @@
+from urllib.parse import parse_qs
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.exceptions import TokenError
+from rest_framework_simplejwt.tokens import AccessToken
+
+from .models import User
+
+
+@database_sync_to_async
+def get_user(token):
+    try:
+        user_id = AccessToken(token)["user_id"]
+    except (TokenError, KeyError):
+        return AnonymousUser()
+    return User.objects.filter(pk=user_id, is_active=True).first() or AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """Authenticates WebSocket connections from ``?token=<access token>``,
+    since browsers can't set an Authorization header on a WebSocket."""
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get("query_string", b"").decode())
+        token = query.get("token", [None])[0]
+        scope["user"] = await get_user(token) if token else AnonymousUser()
+        return await super().__call__(scope, receive, send)
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:53
+
+from django.db import migrations, models
+
+
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def backfill_delivery_weekdays(apps, schema_editor):
+    Customer = apps.get_model("api", "Customer")
+    customers = []
+    for customer in Customer.objects.only("id", "delivery_days").iterator(chunk_size=2000):
+        mask = 0
+        for day in customer.delivery_days or []:
+            name = str(day).strip().lower()
+            if name in WEEKDAYS:
+                mask |= 1 << WEEKDAYS.index(name)
+        if mask:
+            customer.delivery_weekdays = mask
+            customers.append(customer)
+    Customer.objects.bulk_update(customers, ["delivery_weekdays"], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customer',
+            name='delivery_weekdays',
+            field=models.PositiveSmallIntegerField(db_index=True, default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_delivery_weekdays, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,45 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:53
+
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_delivery_date(apps, schema_editor):
+    # Only the earliest order per customer and day gets a delivery_date, so
+    # duplicates left behind by overlapping runs don't break the constraint.
+    Order = apps.get_model("api", "Order")
+    seen = set()
+    orders = []
+    queryset = (
+        Order.objects.filter(delivery_time__isnull=False)
+        .only("id", "customer_id", "delivery_time")
+        .order_by("id")
+    )
+    for order in queryset.iterator(chunk_size=2000):
+        key = (order.customer_id, timezone.localdate(order.delivery_time))
+        if key in seen:
+            continue
+        seen.add(key)
+        order.delivery_date = key[1]
+        orders.append(order)
+    Order.objects.bulk_update(orders, ["delivery_date"], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0002_customer_delivery_weekdays'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='delivery_date',
+            field=models.DateField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_delivery_date, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='order',
+            constraint=models.UniqueConstraint(fields=('customer', 'delivery_date'), name='unique_order_per_customer_day'),
+        ),
+    ]
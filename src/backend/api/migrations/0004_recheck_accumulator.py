@@ -0,0 +1,68 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:55
+
+import django.db.models.deletion
+from collections import defaultdict
+from datetime import timedelta
+from django.db import migrations, models
+from django.utils import timezone
+
+
+def backfill_accumulators(apps, schema_editor):
+    Customer = apps.get_model("api", "Customer")
+    Order = apps.get_model("api", "Order")
+    RecheckAccumulator = apps.get_model("api", "RecheckAccumulator")
+
+    starting_dates = dict(
+        Customer.objects.exclude(starting_date__isnull=True).values_list("id", "starting_date")
+    )
+    totals = defaultdict(lambda: [0, 0])
+    orders = Order.objects.filter(status="confirmed").values_list(
+        "customer_id", "delivery_date", "created_at", "filled_amount"
+    )
+    for customer_id, delivery_date, created_at, filled_amount in orders.iterator(chunk_size=2000):
+        starting_date = starting_dates.get(customer_id)
+        day = delivery_date or timezone.localdate(created_at)
+        if not starting_date or day < starting_date:
+            continue
+        period_start = starting_date + timedelta(days=(day - starting_date).days // 30 * 30)
+        totals[(customer_id, period_start)][0] += 1
+        totals[(customer_id, period_start)][1] += filled_amount or 0
+
+    RecheckAccumulator.objects.bulk_create(
+        [
+            RecheckAccumulator(
+                customer_id=customer_id,
+                period_start=period_start,
+                period_end=period_start + timedelta(days=29),
+                total_trips=trips,
+                total_gallons=gallons,
+            )
+            for (customer_id, period_start), (trips, gallons) in totals.items()
+        ],
+        batch_size=2000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0003_order_delivery_date'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecheckAccumulator',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('period_start', models.DateField(db_index=True)),
+                ('period_end', models.DateField()),
+                ('total_trips', models.IntegerField(default=0)),
+                ('total_gallons', models.IntegerField(default=0)),
+                ('customer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='recheck_accumulators', to='api.customer')),
+            ],
+            options={
+                'unique_together': {('customer', 'period_start')},
+            },
+        ),
+        migrations.RunPython(backfill_accumulators, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 5.2.6 on 2026-10-18 07:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0005_order_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DailyMetrics',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('date', models.DateField(unique=True)),
+                ('orders_total', models.IntegerField(default=0)),
+                ('orders_pending', models.IntegerField(default=0)),
+                ('orders_confirmed', models.IntegerField(default=0)),
+                ('orders_completed', models.IntegerField(default=0)),
+                ('orders_canceled', models.IntegerField(default=0)),
+                ('orders_problem', models.IntegerField(default=0)),
+                ('gallons_filled', models.IntegerField(default=0)),
+                ('invoices_count', models.IntegerField(default=0)),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=14)),
+                ('complaints', models.IntegerField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['date'],
+            },
+        ),
+    ]
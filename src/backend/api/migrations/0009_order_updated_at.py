@@ -0,0 +1,30 @@
+from django.db import migrations, models
+from django.db.models import F
+from django.db.models.functions import Coalesce
+import django.utils.timezone
+
+
+def backfill_updated_at(apps, schema_editor):
+    Order = apps.get_model("api", "Order")
+    Order.objects.update(updated_at=Coalesce(F("confirmed_at"), F("created_at")))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0008_search_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='updated_at',
+            field=models.DateTimeField(auto_now=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.RunPython(backfill_updated_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['driver', 'delivery_date', 'updated_at'], name='order_driver_day_updated'),
+        ),
+    ]
@@ -0,0 +1,16 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0009_order_updated_at'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='proof_thumbnail',
+            field=models.ImageField(blank=True, editable=False, null=True, upload_to='orders/proofs/thumbs/'),
+        ),
+    ]
@@ -0,0 +1,30 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:10
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0011_upload_session'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DriverActionReceipt',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=100)),
+                ('action', models.CharField(max_length=20)),
+                ('result', models.JSONField(default=dict)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+                ('driver', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='action_receipts', to=settings.AUTH_USER_MODEL)),
+                ('order', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='action_receipts', to='api.order')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('driver', 'key'), name='unique_driver_action_key')],
+            },
+        ),
+    ]
@@ -0,0 +1,41 @@
+import math
+
+from django.db import migrations, models
+
+
+def backfill_confirmation_delay(apps, schema_editor):
+    Order = apps.get_model("api", "Order")
+    confirmed = Order.objects.filter(confirmed_at__isnull=False).only("confirmed_at", "delivery_time", "created_at")
+    batch = []
+    for order in confirmed.iterator(chunk_size=2000):
+        # Same rule as api.models.confirmation_delay at the time of writing:
+        # whole seconds from the scheduled delivery time (or creation),
+        # rounded up.
+        reference = order.delivery_time or order.created_at
+        order.confirmation_delay = math.ceil((order.confirmed_at - reference).total_seconds()) if reference else None
+        batch.append(order)
+        if len(batch) >= 2000:
+            Order.objects.bulk_update(batch, ["confirmation_delay"])
+            batch = []
+    if batch:
+        Order.objects.bulk_update(batch, ["confirmation_delay"])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0012_driver_action_receipt'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='confirmation_delay',
+            field=models.IntegerField(blank=True, editable=False, null=True),
+        ),
+        migrations.RunPython(backfill_confirmation_delay, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['delivery_date', 'driver', 'confirmation_delay'], name='order_day_driver_delay'),
+        ),
+    ]
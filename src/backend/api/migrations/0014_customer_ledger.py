@@ -0,0 +1,53 @@
+# Generated by Django 5.2.6 on 2026-10-18 08:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import Count, Max, Sum
+
+
+def backfill_ledger(apps, schema_editor):
+    RecheckInvoice = apps.get_model("api", "RecheckInvoice")
+    FinalInvoice = apps.get_model("api", "FinalInvoice")
+    CustomerLedger = apps.get_model("api", "CustomerLedger")
+
+    ledgers = {}
+    rechecks = RecheckInvoice.objects.values("customer_id").annotate(periods=Count("id"), gallons=Sum("total_gallons"))
+    for row in rechecks:
+        ledgers[row["customer_id"]] = CustomerLedger(
+            customer_id=row["customer_id"], period_count=row["periods"], gallons=row["gallons"] or 0
+        )
+    invoices = FinalInvoice.objects.values("recheck__customer_id").annotate(
+        invoiced=Sum("total"), invoices=Count("id"), last=Max("finalized_at")
+    )
+    for row in invoices:
+        ledger = ledgers[row["recheck__customer_id"]]
+        ledger.invoiced = row["invoiced"] or 0
+        ledger.invoice_count = row["invoices"]
+        ledger.last_invoice_at = row["last"]
+    CustomerLedger.objects.bulk_create(ledgers.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0013_order_confirmation_delay'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CustomerLedger',
+            fields=[
+                ('customer', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='ledger', serialize=False, to='api.customer')),
+                ('invoiced', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('invoice_count', models.IntegerField(default=0)),
+                ('period_count', models.IntegerField(default=0)),
+                ('gallons', models.BigIntegerField(default=0)),
+                ('last_invoice_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-invoiced'], name='ledger_invoiced'), models.Index(fields=['-last_invoice_at'], name='ledger_last_invoice')],
+            },
+        ),
+        migrations.RunPython(backfill_ledger, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,35 @@
+from django.db import migrations
+from django.utils import timezone
+
+
+def backfill_delivery_date(apps, schema_editor):
+    # Orders created through the API never got a delivery_date. They take
+    # the day of their delivery_time, or of their creation, unless that day
+    # is already taken for the customer.
+    Order = apps.get_model("api", "Order")
+    missing = Order.objects.filter(delivery_date__isnull=True)
+    taken = set(
+        Order.objects.filter(
+            delivery_date__isnull=False, customer_id__in=missing.values("customer_id")
+        ).values_list("customer_id", "delivery_date")
+    )
+    orders = []
+    for order in missing.only("id", "customer_id", "delivery_time", "created_at").order_by("id").iterator(chunk_size=2000):
+        key = (order.customer_id, timezone.localdate(order.delivery_time or order.created_at))
+        if key in taken:
+            continue
+        taken.add(key)
+        order.delivery_date = key[1]
+        orders.append(order)
+    Order.objects.bulk_update(orders, ["delivery_date"], batch_size=2000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('api', '0014_customer_ledger'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_delivery_date, migrations.RunPython.noop),
+    ]
@@ -1,10 +1,78 @@
-from django.db import models
+from django.db import models, transaction, IntegrityError
+from django.db.models import F, Q, Case, When, Value, OuterRef, Subquery, Count, Sum
+from django.db.models.functions import Coalesce, TruncDate
 from django.conf import settings
 from django.utils import timezone
 from django.contrib.auth.models import AbstractUser
+from collections import defaultdict
+from functools import reduce
+from operator import or_
 from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+import math
+import os
+import uuid
 
 
+WEEKDAYS = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+
+
+def delivery_days_to_mask(days):
+    mask = 0
+    for day in days or []:
+        name = str(day).strip().lower()
+        if name in WEEKDAYS:
+            mask |= 1 << WEEKDAYS.index(name)
+    return mask
+
+
+def weekday_masks(weekday):
+    # Every mask that has the given weekday's bit set, so "due on weekday"
+    # becomes an indexable IN lookup instead of a bitwise expression.
+    bit = 1 << weekday
+    return [mask for mask in range(1, 1 << len(WEEKDAYS)) if mask & bit]
+
+
+def confirmation_delay(confirmed_at, delivery_time, created_at):
+    # Orders are materialized ahead of time, so lateness is measured from
+    # the scheduled delivery time when there is one. Whole seconds, rounded
+    # up so a delay just past a threshold still counts as past it.
+    reference = delivery_time or created_at
+    if confirmed_at and reference:
+        return math.ceil((confirmed_at - reference).total_seconds())
+    return None
+
+
+def confirmation_is_late(confirmed_at, delivery_time, created_at, minutes=30):
+    delay = confirmation_delay(confirmed_at, delivery_time, created_at)
+    return delay is not None and delay > minutes * 60
+
+
+RECHECK_PERIOD_DAYS = 30
+
+
+def recheck_period(starting_date, day):
+    if not starting_date or day < starting_date:
+        return None
+    index = (day - starting_date).days // RECHECK_PERIOD_DAYS
+    period_start = starting_date + timedelta(days=index * RECHECK_PERIOD_DAYS)
+    return period_start, period_start + timedelta(days=RECHECK_PERIOD_DAYS - 1)
+
+
+CENTS = Decimal("0.01")
+
+
+def to_decimal(value):
+    return value if isinstance(value, Decimal) else Decimal(str(value))
+
+
+def invoice_totals(gallons, price_per_gallon, vat_percent):
+    """``(subtotal, vat_amount, total)`` in exact decimals, each rounded half
+    up to cents."""
+    subtotal = (Decimal(gallons or 0) * to_decimal(price_per_gallon)).quantize(CENTS, ROUND_HALF_UP)
+    vat_amount = (subtotal * to_decimal(vat_percent) / 100).quantize(CENTS, ROUND_HALF_UP)
+    return subtotal, vat_amount, subtotal + vat_amount
+
 
 class User(AbstractUser):
     ROLE_CHOICES = [
@@ -53,11 +121,46 @@ class Customer(models.Model):
     weekly_trips = models.IntegerField(blank=True, null=True)
     delivery_days = models.JSONField(default=list, blank=True)
     delivery_time = models.TimeField(null=True, blank=True) 
+    delivery_weekdays = models.PositiveSmallIntegerField(default=0, db_index=True, editable=False)
 
     gallons = models.IntegerField(blank=True, null=True)
     filling_stations = models.CharField(max_length=255, blank=True, null=True)
     location_link = models.URLField(blank=True, null=True)
 
+    SCHEDULE_FIELDS = ("weekly_trips", "delivery_days", "delivery_time", "gallons", "driver_id", "location_link")
+    # Shown on the driver manifest; its delta sync only sees Order.updated_at.
+    MANIFEST_FIELDS = ("full_name", "phone")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_schedule = instance._snapshot(cls.SCHEDULE_FIELDS)
+        instance._loaded_manifest = instance._snapshot(cls.MANIFEST_FIELDS)
+        return instance
+
+    def _snapshot(self, fields):
+        if self.get_deferred_fields() & set(fields):
+            return None
+        return tuple(getattr(self, field) for field in fields)
+
+    def save(self, *args, **kwargs):
+        self.delivery_weekdays = delivery_days_to_mask(self.delivery_days)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and "delivery_days" in update_fields:
+            kwargs["update_fields"] = {*update_fields, "delivery_weekdays"}
+        super().save(*args, **kwargs)
+
+        snapshot = self._snapshot(self.SCHEDULE_FIELDS)
+        if snapshot is None or snapshot != getattr(self, "_loaded_schedule", None):
+            from .scheduling import sync_customer_schedules
+            sync_customer_schedules([self.pk])
+            self._loaded_schedule = snapshot
+
+        manifest = self._snapshot(self.MANIFEST_FIELDS)
+        if hasattr(self, "_loaded_manifest") and manifest != self._loaded_manifest:
+            self.orders.update(updated_at=timezone.now())
+        self._loaded_manifest = manifest
+
     def __str__(self):
     	return f"{self.full_name} ({self.phone})"
 
@@ -88,7 +191,14 @@ class Order(models.Model):
         blank=True,
         null=True
     )
+    proof_thumbnail = models.ImageField(
+        upload_to="orders/proofs/thumbs/",
+        blank=True,
+        null=True,
+        editable=False
+    )
     delivery_time = models.DateTimeField(null=True, blank=True)
+    delivery_date = models.DateField(null=True, blank=True, editable=False)
     required_gallons = models.IntegerField(null=True, blank=True)
     customer_location = models.URLField(null=True, blank=True)
     filled_amount = models.IntegerField(null=True, blank=True)
@@ -96,6 +206,77 @@ class Order(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
     created_at = models.DateTimeField(auto_now_add=True)
     confirmed_at = models.DateTimeField(null=True, blank=True)
+    # Seconds from the scheduled delivery to confirmation, kept in step with
+    # confirmed_at so delivery analytics can aggregate it in the database.
+    confirmation_delay = models.IntegerField(null=True, blank=True, editable=False)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["customer", "delivery_date"],
+                name="unique_order_per_customer_day",
+            ),
+        ]
+        indexes = [
+            models.Index(fields=["customer", "status", "created_at"], name="order_customer_status_created"),
+            models.Index(fields=["driver", "-created_at"], name="order_driver_created"),
+            models.Index(fields=["-created_at", "id"], name="order_created"),
+            models.Index(fields=["status", "delivery_date"], name="order_status_delivery_date"),
+            models.Index(
+                fields=["delivery_date"],
+                condition=models.Q(status="pending"),
+                name="order_pending",
+            ),
+            models.Index(fields=["driver", "delivery_date", "updated_at"], name="order_driver_day_updated"),
+            models.Index(fields=["delivery_date", "driver", "confirmation_delay"], name="order_day_driver_delay"),
+        ]
+
+    BILLING_FIELDS = ("customer_id", "status", "filled_amount", "delivery_date", "created_at")
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & set(cls.BILLING_FIELDS):
+            instance._loaded_billing = instance.billing_contribution()
+            instance._loaded_status = instance.status
+        return instance
+
+    def billing_contribution(self):
+        if self.status != "confirmed":
+            return None
+        day = self.delivery_date or timezone.localdate(self.created_at)
+        return self.customer_id, day, int(self.filled_amount or 0)
+
+    def save(self, *args, **kwargs):
+        # The delivery day always follows delivery_time, so rescheduling an
+        # order moves it to its new day; orders without one belong to the
+        # day they were created.
+        reference = self.delivery_time or self.created_at
+        day = timezone.localdate(reference) if reference else timezone.localdate()
+        if not self._state.adding and self.delivery_date is None and (
+            Order.objects.filter(customer_id=self.customer_id, delivery_date=day).exclude(pk=self.pk).exists()
+        ):
+            # A legacy same-day duplicate the backfills left without a day
+            # keeps none, rather than clash with the order that has it.
+            day = None
+        self.delivery_date = day
+        self.confirmation_delay = confirmation_delay(self.confirmed_at, self.delivery_time, self.created_at)
+        if self._state.adding:
+            previous = None
+        elif hasattr(self, "_loaded_billing"):
+            previous = self._loaded_billing
+        else:
+            previous = Order.objects.get(pk=self.pk).billing_contribution()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            current = self.billing_contribution()
+            if previous != current:
+                if previous:
+                    RecheckAccumulator.record(previous[0], previous[1], -1, -previous[2])
+                if current:
+                    RecheckAccumulator.record(current[0], current[1], 1, current[2])
+        self._loaded_billing = current
 
     def confirm(self, filled_amount, proof_image):
         if not proof_image:
@@ -106,7 +287,10 @@ class Order(models.Model):
         self.filled_amount = filled_amount
         self.proof_image = proof_image
         self.confirmed_at = timezone.now()
+        self.proof_thumbnail = None
         self.save()
+        from .tasks import process_proof_image
+        transaction.on_commit(lambda: process_proof_image.delay(self.pk))
 
     def mark_problem(self, reason):
         self.status = "problem"
@@ -114,9 +298,7 @@ class Order(models.Model):
         self.save()
 
     def is_driver_late(self, minutes=30):
-        if self.confirmed_at and self.created_at:
-            return (self.confirmed_at - self.created_at).total_seconds() > minutes * 60
-        return False
+        return confirmation_is_late(self.confirmed_at, self.delivery_time, self.created_at, minutes)
 
     def __str__(self):
         return f"Order for {self.customer.full_name} ({self.status})"
@@ -147,10 +329,184 @@ class RecheckInvoice(models.Model):
         unique_together = ("customer", "period_start")
         ordering = ["-period_start"]
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if not instance.get_deferred_fields() & {"customer_id", "total_gallons"}:
+            instance._loaded_ledger = instance.ledger_contribution()
+        return instance
+
+    def ledger_contribution(self):
+        return self.customer_id, self.total_gallons
+
+    def save(self, *args, **kwargs):
+        if self._state.adding:
+            previous = None
+        elif hasattr(self, "_loaded_ledger"):
+            previous = self._loaded_ledger
+        else:
+            previous = RecheckInvoice.objects.get(pk=self.pk).ledger_contribution()
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            current = self.ledger_contribution()
+            if previous != current:
+                changes = [(current[0], 0, 0, 1, current[1])]
+                if previous:
+                    changes.append((previous[0], 0, 0, -1, -previous[1]))
+                CustomerLedger.record_many(changes)
+        self._loaded_ledger = current
+
     def __str__(self):
         return f"Recheck {self.customer.full_name} ({self.period_start} → {self.period_end})"
 
 
+class RecheckAccumulator(models.Model):
+    # Running totals of confirmed orders for a customer's open or closed
+    # period; closing a period copies these onto a RecheckInvoice.
+    customer = models.ForeignKey(Customer, on_delete=models.CASCADE, related_name="recheck_accumulators")
+    period_start = models.DateField(db_index=True)
+    period_end = models.DateField()
+    total_trips = models.IntegerField(default=0)
+    total_gallons = models.IntegerField(default=0)
+
+    class Meta:
+        unique_together = ("customer", "period_start")
+
+    @classmethod
+    def record(cls, customer_id, day, trips, gallons):
+        starting_date = Customer.objects.filter(pk=customer_id).values_list("starting_date", flat=True).first()
+        period = recheck_period(starting_date, day)
+        increments = {
+            "total_trips": F("total_trips") + trips,
+            "total_gallons": F("total_gallons") + gallons,
+        }
+        if period is not None:
+            period_start, period_end = period
+            accumulator = cls.objects.filter(customer_id=customer_id, period_start=period_start)
+            # Removals only ever adjust an existing period; creating one here
+            # could also race a cascade that is deleting the customer.
+            if not accumulator.update(**increments) and trips > 0:
+                try:
+                    with transaction.atomic():
+                        cls.objects.create(
+                            customer_id=customer_id,
+                            period_start=period_start,
+                            period_end=period_end,
+                            total_trips=trips,
+                            total_gallons=gallons,
+                        )
+                except IntegrityError:
+                    accumulator.update(**increments)
+        # Confirmations that land after the period was closed still reach
+        # the recheck covering that day as long as it is still a draft.
+        if RecheckInvoice.objects.filter(
+            customer_id=customer_id, period_start__lte=day, period_end__gte=day, status="draft"
+        ).update(**increments):
+            CustomerLedger.record_many([(customer_id, 0, 0, 0, gallons)])
+
+    @classmethod
+    def record_many(cls, changes):
+        """Apply ``(customer_id, day, trips, gallons)`` changes in bulk: a fixed
+        number of queries however many orders and periods they touch."""
+        changes = list(changes)
+        starting_dates = dict(
+            Customer.objects.filter(pk__in={change[0] for change in changes}).values_list("id", "starting_date")
+        )
+        totals = {}
+        daily = {}
+        for customer_id, day, trips, gallons in changes:
+            total_trips, total_gallons = daily.get((customer_id, day), (0, 0))
+            daily[customer_id, day] = (total_trips + trips, total_gallons + gallons)
+            period = recheck_period(starting_dates.get(customer_id), day)
+            if period is None:
+                continue
+            key = (customer_id, *period)
+            total_trips, total_gallons = totals.get(key, (0, 0))
+            totals[key] = (total_trips + trips, total_gallons + gallons)
+        totals = {key: total for key, total in totals.items() if total != (0, 0)}
+        if totals:
+            cls.objects.bulk_create(
+                [cls(customer_id=customer_id, period_start=start, period_end=end) for customer_id, start, end in totals],
+                ignore_conflicts=True,
+            )
+            periods = reduce(or_, (Q(customer_id=customer_id, period_start=start) for customer_id, start, _ in totals))
+            cls.objects.filter(periods).update(**cls.increments(
+                (Q(customer_id=customer_id, period_start=start), total)
+                for (customer_id, start, _), total in totals.items()
+            ))
+
+        daily = {key: total for key, total in daily.items() if total != (0, 0)}
+        if not daily:
+            return
+        # Drafts are matched on the day itself, whatever their bounds.
+        drafts = RecheckInvoice.objects.filter(
+            reduce(or_, (
+                Q(customer_id=customer_id, period_start__lte=day, period_end__gte=day)
+                for customer_id, day in daily
+            )),
+            status="draft",
+        ).values_list("id", "customer_id", "period_start", "period_end")
+        by_draft = {}
+        for draft_id, customer_id, start, end in drafts:
+            trips = gallons = 0
+            for (customer, day), (day_trips, day_gallons) in daily.items():
+                if customer == customer_id and start <= day <= end:
+                    trips += day_trips
+                    gallons += day_gallons
+            by_draft[draft_id] = (customer_id, (trips, gallons))
+        if by_draft:
+            RecheckInvoice.objects.filter(pk__in=by_draft).update(**cls.increments(
+                (Q(pk=draft_id), total) for draft_id, (_, total) in by_draft.items()
+            ))
+            CustomerLedger.record_many(
+                (customer_id, 0, 0, 0, total[1]) for customer_id, total in by_draft.values()
+            )
+
+    @staticmethod
+    def increments(rows):
+        trips = []
+        gallons = []
+        for match, (row_trips, row_gallons) in rows:
+            trips.append(When(match, then=Value(row_trips)))
+            gallons.append(When(match, then=Value(row_gallons)))
+        return {
+            "total_trips": F("total_trips") + Case(*trips, default=Value(0)),
+            "total_gallons": F("total_gallons") + Case(*gallons, default=Value(0)),
+        }
+
+    @classmethod
+    def recount(cls, periods):
+        """Confirmed ``(trips, gallons)`` per ``(customer_id, period_start,
+        period_end)``, counted from the orders themselves in one query."""
+        periods = list(periods)
+        if not periods:
+            return {}
+        by_customer = defaultdict(list)
+        for customer_id, start, end in periods:
+            by_customer[customer_id].append((start, end))
+        daily = (
+            Order.objects.filter(status="confirmed", customer_id__in=by_customer)
+            .filter(
+                Q(delivery_date__gte=min(period[1] for period in periods), delivery_date__lte=max(period[2] for period in periods))
+                | Q(delivery_date__isnull=True)
+            )
+            .annotate(day=Coalesce("delivery_date", TruncDate("created_at")))
+            .values("customer_id", "day")
+            .annotate(trips=Count("id"), gallons=Sum("filled_amount"))
+            .values_list("customer_id", "day", "trips", "gallons")
+        )
+        totals = {period: (0, 0) for period in periods}
+        for customer_id, day, trips, gallons in daily:
+            for start, end in by_customer[customer_id]:
+                if start <= day <= end:
+                    total_trips, total_gallons = totals[customer_id, start, end]
+                    totals[customer_id, start, end] = (total_trips + trips, total_gallons + (gallons or 0))
+        return totals
+
+    def __str__(self):
+        return f"Accumulator {self.customer_id} ({self.period_start} → {self.period_end})"
+
+
 class FinalInvoice(models.Model):
 
     recheck = models.OneToOneField(RecheckInvoice, on_delete=models.CASCADE, related_name="final_invoice")
@@ -161,20 +517,104 @@ class FinalInvoice(models.Model):
     vat_amount = models.DecimalField(max_digits=14, decimal_places=2, default=0)
     total = models.DecimalField(max_digits=14, decimal_places=2, default=0)
     notes = models.TextField(blank=True, null=True)
-    finalized_at = models.DateTimeField(auto_now_add=True)
+    finalized_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "total" not in instance.get_deferred_fields():
+            instance._loaded_total = instance.total
+        return instance
 
     def calculate_totals(self):
-        gallons = self.recheck.total_gallons or 0
-        self.subtotal = round(gallons * float(self.price_per_gallon), 2)
-        self.vat_amount = round(self.subtotal * (float(self.vat_percent) / 100.0), 2)
-        self.total = round(self.subtotal + self.vat_amount, 2)
+        self.subtotal, self.vat_amount, self.total = invoice_totals(
+            self.recheck.total_gallons, self.price_per_gallon, self.vat_percent
+        )
 
     def save(self, *args, **kwargs):
         self.calculate_totals()
-        super().save(*args, **kwargs)
+        adding = self._state.adding
+        if adding:
+            previous = Decimal("0")
+        elif hasattr(self, "_loaded_total"):
+            previous = self._loaded_total
+        else:
+            previous = FinalInvoice.objects.get(pk=self.pk).total
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if adding or previous != self.total:
+                CustomerLedger.record_many([(self.recheck.customer_id, self.total - previous, int(adding), 0, 0)])
+        self._loaded_total = self.total
 
     def __str__(self):
         return f"FinalInvoice #{self.id} - {self.recheck.customer.full_name} - {self.recheck.month.strftime('%Y-%m')}"
+
+
+class CustomerLedger(models.Model):
+    # Running per-customer totals over rechecks and final invoices, moved
+    # along with every write to them so finance views read one row per
+    # customer instead of re-aggregating the invoice history.
+    customer = models.OneToOneField(Customer, on_delete=models.CASCADE, primary_key=True, related_name="ledger")
+    invoiced = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    invoice_count = models.IntegerField(default=0)
+    period_count = models.IntegerField(default=0)
+    gallons = models.BigIntegerField(default=0)
+    last_invoice_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["-invoiced"], name="ledger_invoiced"),
+            models.Index(fields=["-last_invoice_at"], name="ledger_last_invoice"),
+        ]
+
+    @classmethod
+    def record_many(cls, changes):
+        """Apply ``(customer_id, invoiced, invoices, periods, gallons)`` deltas
+        in a fixed number of queries per 500 customers. Rows are only created by changes that
+        add a recheck or an invoice, so removals never resurrect a ledger."""
+        totals = {}
+        for customer_id, *deltas in changes:
+            current = totals.get(customer_id, (Decimal("0"), 0, 0, 0))
+            totals[customer_id] = tuple(total + delta for total, delta in zip(current, deltas))
+        totals = {customer_id: total for customer_id, total in totals.items() if any(total)}
+        if not totals:
+            return
+
+        opened = [customer_id for customer_id, total in totals.items() if total[1] > 0 or total[2] > 0]
+        if opened:
+            cls.objects.bulk_create(
+                [cls(customer_id=customer_id) for customer_id in opened], ignore_conflicts=True, batch_size=500
+            )
+
+        now = timezone.now()
+        items = list(totals.items())
+        for start in range(0, len(items), 500):
+            chunk = dict(items[start:start + 500])
+            increments = {}
+            for index, (field, zero) in enumerate(
+                [("invoiced", Decimal("0")), ("invoice_count", 0), ("period_count", 0), ("gallons", 0)]
+            ):
+                cases = [
+                    When(customer_id=customer_id, then=Value(total[index]))
+                    for customer_id, total in chunk.items()
+                    if total[index]
+                ]
+                if cases:
+                    increments[field] = F(field) + Case(*cases, default=Value(zero))
+            cls.objects.filter(customer_id__in=chunk).update(**increments, updated_at=now)
+
+            # A latest date can't be decremented, so it is read back whenever
+            # invoices were added or removed.
+            invoiced = [customer_id for customer_id, total in chunk.items() if total[1]]
+            if invoiced:
+                latest = FinalInvoice.objects.filter(recheck__customer_id=OuterRef("customer_id")).order_by("-finalized_at")
+                cls.objects.filter(customer_id__in=invoiced).update(
+                    last_invoice_at=Subquery(latest.values("finalized_at")[:1])
+                )
+
+    def __str__(self):
+        return f"Ledger {self.customer_id}: {self.invoiced}"
     
 
 class Complaint(models.Model):
@@ -207,5 +647,114 @@ class Complaint(models.Model):
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="new")
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=["status", "-created_at"], name="complaint_status_created"),
+        ]
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        if "status" in field_names:
+            instance._loaded_status = instance.status
+        return instance
+
     def __str__(self):
         return f"Complaint #{self.id} - {self.customer.full_name}"
+
+
+class DailyMetrics(models.Model):
+    date = models.DateField(unique=True)
+    orders_total = models.IntegerField(default=0)
+    orders_pending = models.IntegerField(default=0)
+    orders_confirmed = models.IntegerField(default=0)
+    orders_completed = models.IntegerField(default=0)
+    orders_canceled = models.IntegerField(default=0)
+    orders_problem = models.IntegerField(default=0)
+    gallons_filled = models.IntegerField(default=0)
+    invoices_count = models.IntegerField(default=0)
+    revenue = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    complaints = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["date"]
+
+    def __str__(self):
+        return f"Metrics {self.date}"
+
+
+class ExportJob(models.Model):
+    STATUS_CHOICES = [
+        ("pending", "Pending"),
+        ("running", "Running"),
+        ("done", "Done"),
+        ("failed", "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50)
+    params = models.JSONField(default=dict, blank=True)
+    params_hash = models.CharField(max_length=64)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="pending")
+    progress = models.IntegerField(default=0)
+    total = models.IntegerField(null=True, blank=True)
+    file = models.FileField(upload_to="exports/", blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+    created_by = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="export_jobs")
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["created_by", "kind", "params_hash", "-created_at"], name="exportjob_reuse"),
+        ]
+
+    def __str__(self):
+        return f"Export {self.kind} ({self.status})"
+
+
+class UploadSession(models.Model):
+    STATUS_CHOICES = [
+        ("open", "Open"),
+        ("complete", "Complete"),
+        ("used", "Used"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name="upload_sessions")
+    driver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="upload_sessions")
+    filename = models.CharField(max_length=255)
+    content_type = models.CharField(max_length=100, blank=True)
+    size = models.PositiveBigIntegerField()
+    offset = models.PositiveBigIntegerField(default=0)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default="open")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def path(self):
+        return os.path.join(settings.UPLOAD_SESSION_ROOT, f"{self.pk}.part")
+
+    def __str__(self):
+        return f"Upload {self.filename} ({self.offset}/{self.size})"
+
+
+class DriverActionReceipt(models.Model):
+    # Remembers applied offline actions by their client key, so a replayed
+    # batch gets the original result instead of being applied twice.
+    driver = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="action_receipts")
+    key = models.CharField(max_length=100)
+    order = models.ForeignKey(Order, on_delete=models.SET_NULL, null=True, blank=True, related_name="action_receipts")
+    action = models.CharField(max_length=20)
+    result = models.JSONField(default=dict)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["driver", "key"], name="unique_driver_action_key"),
+        ]
+
+    def __str__(self):
+        return f"{self.action} {self.key} by {self.driver_id}"
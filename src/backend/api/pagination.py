@@ -0,0 +1,70 @@
+from collections import OrderedDict
+from rest_framework.pagination import PageNumberPagination, CursorPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param, remove_query_param
+
+
+class KeysetCursorPagination(CursorPagination):
+    # The ordering comes from the view's OrderingFilter, so the cursor is
+    # keyed on the same fields the page-number mode sorts by.
+    cursor_query_param = "cursor"
+
+
+class OptionalCursorPagination(PageNumberPagination):
+    """Page-number pagination with two opt-ins for long histories.
+
+    ``?pagination=cursor`` (or any request carrying ``?cursor=``) switches to
+    keyset pagination, which stays constant-time however deep the client
+    scrolls. ``?count=false`` keeps page numbers but skips the ``COUNT(*)``
+    and only reports whether a next page exists.
+    """
+    mode_query_param = "pagination"
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.cursor_paginator = None
+        self.skip_count = False
+        if request.query_params.get(self.mode_query_param) == "cursor" or "cursor" in request.query_params:
+            self.cursor_paginator = KeysetCursorPagination()
+            return self.cursor_paginator.paginate_queryset(queryset, request, view)
+        if request.query_params.get(self.count_query_param, "").lower() in ("false", "0"):
+            self.skip_count = True
+            return self.paginate_without_count(queryset, request)
+        return super().paginate_queryset(queryset, request, view)
+
+    def paginate_without_count(self, queryset, request):
+        self.request = request
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        try:
+            self.page_number = max(int(request.query_params.get(self.page_query_param, 1)), 1)
+        except ValueError:
+            self.page_number = 1
+        offset = (self.page_number - 1) * page_size
+        rows = list(queryset[offset:offset + page_size + 1])
+        self.has_next = len(rows) > page_size
+        return rows[:page_size]
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        if self.skip_count:
+            url = self.request.build_absolute_uri()
+            next_url = previous_url = None
+            if self.has_next:
+                next_url = self.replace_page(url, self.page_number + 1)
+            if self.page_number > 1:
+                previous_url = self.replace_page(url, self.page_number - 1)
+            return Response(OrderedDict([
+                ("count", None),
+                ("next", next_url),
+                ("previous", previous_url),
+                ("results", data),
+            ]))
+        return super().get_paginated_response(data)
+
+    def replace_page(self, url, page_number):
+        if page_number == 1:
+            return remove_query_param(url, self.page_query_param)
+        return replace_query_param(url, self.page_query_param, page_number)
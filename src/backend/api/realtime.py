@@ -0,0 +1,87 @@
+import json
+import logging
+import weakref
+from collections import Counter, defaultdict
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+
+
+logger = logging.getLogger(__name__)
+
+STAFF_GROUPS = ["role.admin", "role.manager"]
+
+
+def driver_group(driver_id):
+    return f"driver.{driver_id}"
+
+
+def groups_for_user(user):
+    if user.role in ("admin", "manager"):
+        return [f"role.{user.role}"]
+    if user.role == "driver":
+        return [driver_group(user.pk)]
+    return []
+
+
+class Flush:
+    """The on_commit callback scheduled for one published event.
+
+    Queued events hold only a weak reference to their callback. A rollback,
+    of the whole transaction or of a savepoint, makes Django discard the
+    callback, and with it the event: its reference is dead by the time any
+    flush runs.
+    """
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __call__(self):
+        flush(self.connection)
+
+
+def publish(groups, event_type, payload=None, dashboard_delta=None):
+    """Queue an event for ``groups``; it is sent once the surrounding
+    transaction commits, batched with every other event from it."""
+    event = json.loads(json.dumps({"type": event_type, "data": payload or {}}, cls=DjangoJSONEncoder))
+    connection = transaction.get_connection()
+    callback = Flush(connection)
+    pending = getattr(connection, "realtime_pending", None)
+    if pending is None:
+        pending = connection.realtime_pending = []
+    pending.append((weakref.ref(callback), groups, event, dashboard_delta))
+    # The first flush to run sends every live event; the others find the
+    # batch gone. Outside a transaction it runs right away.
+    transaction.on_commit(callback)
+
+
+def flush(connection):
+    pending = getattr(connection, "realtime_pending", None)
+    connection.realtime_pending = None
+    events = [(groups, event, delta) for scheduled, groups, event, delta in pending or [] if scheduled() is not None]
+    if not events:
+        return
+
+    dashboard = Counter()
+    for _, _, delta in events:
+        dashboard.update(delta or {})
+
+    batches = defaultdict(list)
+    for groups, event, _ in events:
+        for group in groups:
+            batches[group].append(event)
+    delta = {key: value for key, value in dashboard.items() if value}
+    if delta:
+        for group in STAFF_GROUPS:
+            batches[group].append({"type": "dashboard.delta", "data": delta})
+
+    channel_layer = get_channel_layer()
+    if channel_layer is None:
+        return
+    for group, events in batches.items():
+        try:
+            async_to_sync(channel_layer.group_send)(group, {"type": "events.batch", "events": events})
+        except Exception:
+            # Realtime delivery is best effort; clients resync over HTTP.
+            logger.exception("could not publish %d events to %s", len(events), group)
@@ -1,5 +1,6 @@
-# from django.urls import re_path
-# from . import consumers
+from django.urls import re_path
+from . import consumers
 
-# websocket_urlpatterns = [
-# ]
\ No newline at end of file
+websocket_urlpatterns = [
+    re_path(r"^ws/events/$", consumers.EventsConsumer.as_asgi()),
+]
@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+from django.conf import settings
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from .models import Customer, Order, weekday_masks
+
+
+SCHEDULE_COLUMNS = ("id", "driver_id", "delivery_time", "gallons", "location_link")
+
+
+def horizon_dates(start=None, days=None):
+    start = start or timezone.localdate()
+    days = days or settings.ORDER_SCHEDULE_HORIZON_DAYS
+    return [start + timedelta(days=offset) for offset in range(days)]
+
+
+def scheduled_customers():
+    return Customer.objects.filter(weekly_trips__gt=0, delivery_time__isnull=False)
+
+
+def build_order(day, customer_id, driver_id, delivery_time, gallons, location_link):
+    return Order(
+        customer_id=customer_id,
+        driver_id=driver_id,
+        delivery_time=timezone.make_aware(datetime.combine(day, delivery_time)),
+        delivery_date=day,
+        required_gallons=gallons,
+        customer_location=location_link,
+        status="pending"
+    )
+
+
+def insert_orders(day, batch):
+    """Insert ``batch`` of orders for ``day``; returns how many were inserted.
+
+    ignore_conflicts can't say which rows it skipped, so customers that
+    already have an order that day are dropped just before the insert.
+    """
+    existing = set(
+        Order.objects.filter(delivery_date=day, customer_id__in=[order.customer_id for order in batch])
+        .values_list("customer_id", flat=True)
+    )
+    batch = [order for order in batch if order.customer_id not in existing]
+    Order.objects.bulk_create(batch, ignore_conflicts=True)
+    return len(batch)
+
+
+def materialize_orders(start=None, days=None, chunk_size=None):
+    """Create the missing pending orders for every scheduled day in the horizon.
+
+    Returns ``(scanned, created)``. Inserts are chunked and conflict-tolerant,
+    so overlapping runs and already-materialized days are harmless; orders
+    another run inserted first are not counted as created.
+    """
+    chunk_size = chunk_size or settings.ORDER_SCHEDULE_CHUNK_SIZE
+    scanned = 0
+    created = 0
+    for day in horizon_dates(start, days):
+        existing_orders = Order.objects.filter(customer=OuterRef("pk"), delivery_date=day)
+        due_customers = (
+            scheduled_customers()
+            .filter(delivery_weekdays__in=weekday_masks(day.weekday()))
+            .exclude(Exists(existing_orders))
+            .values_list(*SCHEDULE_COLUMNS)
+        )
+
+        batch = []
+        for row in due_customers.iterator(chunk_size=chunk_size):
+            scanned += 1
+            batch.append(build_order(day, *row))
+            if len(batch) >= chunk_size:
+                created += insert_orders(day, batch)
+                batch = []
+        if batch:
+            created += insert_orders(day, batch)
+    return scanned, created
+
+
+def sync_customer_schedules(customer_ids, start=None, days=None):
+    """Bring the pending orders of edited customers in line with their schedule.
+
+    Only the given customers are touched: pending orders on days that are no
+    longer scheduled are dropped, the remaining ones pick up the new time,
+    gallons, driver and location, and newly scheduled days are filled in.
+    """
+    dates = horizon_dates(start, days)
+    customers = {
+        row[0]: row
+        for row in Customer.objects.filter(pk__in=customer_ids).values_list(
+            *SCHEDULE_COLUMNS, "delivery_weekdays", "weekly_trips"
+        )
+    }
+
+    scheduled_orders = Order.objects.filter(
+        customer_id__in=customers,
+        delivery_date__gte=dates[0],
+        delivery_date__lte=dates[-1],
+    ).values_list("id", "customer_id", "delivery_date", "status")
+
+    now = timezone.now()
+    stale_ids = []
+    changed = []
+    occupied = set()
+    for order_id, customer_id, day, status in scheduled_orders:
+        row = customers[customer_id]
+        mask, weekly_trips = row[5], row[6]
+        if status != "pending":
+            occupied.add((customer_id, day))
+        elif not weekly_trips or row[2] is None or not mask & (1 << day.weekday()):
+            stale_ids.append(order_id)
+        else:
+            occupied.add((customer_id, day))
+            updated = build_order(day, *row[:5])
+            updated.pk = order_id
+            updated.updated_at = now
+            changed.append(updated)
+
+    new_orders = []
+    for customer_id, driver_id, delivery_time, gallons, location_link, mask, weekly_trips in customers.values():
+        if not weekly_trips or delivery_time is None:
+            continue
+        for day in dates:
+            if mask & (1 << day.weekday()) and (customer_id, day) not in occupied:
+                new_orders.append(build_order(day, customer_id, driver_id, delivery_time, gallons, location_link))
+
+    if stale_ids:
+        Order.objects.filter(pk__in=stale_ids).delete()
+    if changed:
+        Order.objects.bulk_update(
+            changed,
+            ["driver", "delivery_time", "required_gallons", "customer_location", "updated_at"],
+            batch_size=settings.ORDER_SCHEDULE_CHUNK_SIZE,
+        )
+    if new_orders:
+        Order.objects.bulk_create(
+            new_orders, ignore_conflicts=True, batch_size=settings.ORDER_SCHEDULE_CHUNK_SIZE
+        )
+    return len(stale_ids), len(changed), len(new_orders)
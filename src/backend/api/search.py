@@ -0,0 +1,145 @@
+from functools import reduce
+from operator import and_, or_
+from django.db import DEFAULT_DB_ALIAS, connection, connections
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from rest_framework import filters
+
+
+# Text columns that have a search index: pg_trgm GIN indexes on PostgreSQL,
+# FTS5 trigram tables named "<table>_fts" on SQLite (see migration 0008 and
+# restore_search_triggers).
+SEARCH_INDEXES = {
+    "api_customer": ["full_name", "phone", "location_link"],
+    "api_complaint": ["issue"],
+    "api_user": ["username", "first_name", "last_name", "email", "phone"],
+}
+
+# Trigram indexes can't answer queries shorter than one trigram.
+MIN_INDEXED_TERM_LENGTH = 3
+
+_fts_tables = None
+
+
+def sqlite_fts_tables():
+    global _fts_tables
+    if _fts_tables is None:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT name FROM sqlite_master WHERE type = 'table' AND name LIKE '%%_fts'")
+            _fts_tables = {row[0] for row in cursor.fetchall()}
+    return _fts_tables
+
+
+def resolve_path(model, path):
+    *relations, column = path.split("__")
+    for relation in relations:
+        model = model._meta.get_field(relation).related_model
+    return model, relations, column
+
+
+def column_condition(model, column, term):
+    """Condition on ``model``'s own ``column`` matching ``term`` anywhere in
+    it, as icontains does.
+
+    PostgreSQL serves icontains from its trigram indexes directly. SQLite
+    can't index LIKE '%term%', so indexed columns are matched through the
+    FTS5 table and joined back by primary key.
+    """
+    table = model._meta.db_table
+    fts_table = f"{table}_fts"
+    if (
+        connection.vendor == "sqlite"
+        and len(term) >= MIN_INDEXED_TERM_LENGTH
+        and column in SEARCH_INDEXES.get(table, ())
+        and fts_table in sqlite_fts_tables()
+    ):
+        phrase = '"{}"'.format(term.replace('"', '""'))
+        match = RawSQL(
+            f"SELECT rowid FROM {fts_table} WHERE {fts_table} MATCH %s",
+            (f"{column} : {phrase}",),
+        )
+        return Q(pk__in=match)
+    return Q(**{f"{column}__icontains": term})
+
+
+def term_condition(model, paths, term):
+    """Condition matching ``term`` in any of ``paths``.
+
+    Columns reached through a relation are searched on their own table and
+    resolved to an id set (``customer__in=<subquery>``), one per relation.
+    Each side can then use its own search index instead of an OR of LIKEs
+    across the join.
+    """
+    by_relation = {}
+    for path in paths:
+        target, relations, column = resolve_path(model, path)
+        relation = "__".join(relations)
+        _, condition = by_relation.get(relation, (target, Q()))
+        by_relation[relation] = (target, condition | column_condition(target, column, term))
+    return reduce(or_, (
+        Q(**{f"{relation}__in": target._default_manager.filter(condition).values("pk")}) if relation else condition
+        for relation, (target, condition) in by_relation.items()
+    ))
+
+
+def search_trigger_statements(table, columns):
+    fts = f"{table}_fts"
+    names = ", ".join(columns)
+    new_values = ", ".join(f"new.{column}" for column in columns)
+    old_values = ", ".join(f"old.{column}" for column in columns)
+    return {
+        f"{fts}_ai": (
+            f"CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN "
+            f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END"
+        ),
+        f"{fts}_ad": (
+            f"CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); END"
+        ),
+        f"{fts}_au": (
+            f"CREATE TRIGGER {fts}_au AFTER UPDATE ON {table} BEGIN "
+            f"INSERT INTO {fts}({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values}); "
+            f"INSERT INTO {fts}(rowid, {names}) VALUES (new.id, {new_values}); END"
+        ),
+    }
+
+
+def restore_search_triggers(sender, using=DEFAULT_DB_ALIAS, **kwargs):
+    """post_migrate receiver for the SQLite FTS5 tables of migration 0008.
+
+    SQLite drops a table's triggers whenever a migration remakes the table,
+    which most field changes do. The FTS5 table would then go stale without
+    any error, so missing triggers are recreated and their index rebuilt.
+    """
+    database = connections[using]
+    if database.vendor != "sqlite":
+        return
+    with database.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        existing = {(kind, name) for kind, name in cursor.fetchall()}
+        for table, columns in SEARCH_INDEXES.items():
+            fts = f"{table}_fts"
+            if ("table", fts) not in existing:
+                continue
+            missing = [
+                statement for name, statement in search_trigger_statements(table, columns).items()
+                if ("trigger", name) not in existing
+            ]
+            for statement in missing:
+                cursor.execute(statement)
+            if missing:
+                cursor.execute(f"INSERT INTO {fts}({fts}) VALUES ('rebuild')")
+
+
+class IndexedSearchFilter(filters.SearchFilter):
+    def filter_queryset(self, request, queryset, view):
+        search_fields = self.get_search_fields(view, request)
+        search_terms = self.get_search_terms(request)
+        if not search_fields or not search_terms:
+            return queryset
+        if any(field[0] in self.lookup_prefixes for field in search_fields):
+            return super().filter_queryset(request, queryset, view)
+
+        return queryset.filter(reduce(and_, (
+            term_condition(queryset.model, search_fields, term) for term in search_terms
+        )))
@@ -1,13 +1,51 @@
+import os
+from decimal import Decimal
 from rest_framework import serializers
+from django.conf import settings
 from django.contrib.auth import authenticate
+from django.core.exceptions import SuspiciousFileOperation
+from django.utils.text import get_valid_filename
 from rest_framework_simplejwt.tokens import RefreshToken
-from .models import User, Customer, Order, RecheckInvoice, FinalInvoice, Complaint
+from .models import User, Customer, Order, RecheckInvoice, FinalInvoice, CustomerLedger, Complaint, ExportJob, UploadSession
 from drf_spectacular.utils import extend_schema_field
 
 
 from rest_framework import serializers
 from .models import User
 
+class SparseFieldsetMixin:
+    """Lets ``?fields=id,status`` trim a read to just those fields.
+
+    ``select_related_fields`` maps serializer fields to the relations they
+    need, so views can join exactly what the response will touch.
+    """
+    select_related_fields = {}
+
+    @staticmethod
+    def requested_fields(request):
+        if request is None or request.method != "GET":
+            return None
+        raw = request.query_params.get("fields")
+        if not raw:
+            return None
+        return {name.strip() for name in raw.split(",") if name.strip()}
+
+    @classmethod
+    def select_related_for(cls, request):
+        requested = cls.requested_fields(request)
+        return [
+            path for field, path in cls.select_related_fields.items()
+            if requested is None or field in requested
+        ]
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        requested = self.requested_fields(self.context.get("request"))
+        if requested:
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
 class UserSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
@@ -92,6 +130,20 @@ class CheckAuthSerializer(serializers.Serializer):
     authenticated = serializers.BooleanField()
 
 
+DEFAULT_DELIVERY_DAYS = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
+
+
+def resolve_delivery_days(weekly_trips, days):
+    # Customers with trips but no days get the first weekly_trips days of the week.
+    if not days:
+        return DEFAULT_DELIVERY_DAYS[:weekly_trips]
+    if len(days) != weekly_trips:
+        raise serializers.ValidationError(
+            f"({len(days)})({weekly_trips})"
+        )
+    return days
+
+
 class CustomerSerializer(serializers.ModelSerializer):
 
     delivery_time = serializers.TimeField(format="%H:%M")
@@ -118,17 +170,8 @@ class CustomerSerializer(serializers.ModelSerializer):
 
     def validate(self, attrs):
         weekly_trips = attrs.get("weekly_trips")
-        days = attrs.get("delivery_days", [])
-
         if weekly_trips:
-            if not days:
-                default_days = ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]
-                attrs["delivery_days"] = default_days[:weekly_trips]
-            elif len(days) != weekly_trips:
-                raise serializers.ValidationError(
-                    f"({len(days)})({weekly_trips})"
-                )
-
+            attrs["delivery_days"] = resolve_delivery_days(weekly_trips, attrs.get("delivery_days", []))
         return attrs
 
     def create(self, validated_data):
@@ -136,7 +179,21 @@ class CustomerSerializer(serializers.ModelSerializer):
             validated_data["delivery_days"] = list(validated_data["delivery_days"])
         return super().create(validated_data)
 
-class OrderSerializer(serializers.ModelSerializer):
+class CustomerSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Customer
+        fields = ["id", "full_name", "phone", "area", "zone_number"]
+
+
+class UserSummarySerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ["id", "username", "first_name", "last_name", "phone"]
+
+
+class OrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    select_related_fields = {"customer": "customer__driver", "driver": "driver"}
+
     customer = CustomerSerializer(read_only=True)
     driver = UserSerializer(read_only=True)
 
@@ -155,6 +212,7 @@ class OrderSerializer(serializers.ModelSerializer):
 
     is_late = serializers.SerializerMethodField()
     proof_image = serializers.ImageField(read_only=True)
+    proof_thumbnail = serializers.ImageField(read_only=True)
     problem_reason = serializers.CharField(read_only=True)
     filled_amount = serializers.IntegerField(read_only=True)
 
@@ -177,24 +235,42 @@ class OrderSerializer(serializers.ModelSerializer):
         request = self.context.get("request")
         if not (
             request and (
-                request.user == instance.driver
+                request.user.pk == instance.driver_id
                 or (hasattr(request.user, "role") and request.user.role == "admin")
             )
         ):
             ret.pop("proof_image", None)
+            ret.pop("proof_thumbnail", None)
             ret.pop("filled_amount", None)
         if not (request and hasattr(request.user, "role") and request.user.role == "admin"):
             ret.pop("is_late", None)
         return ret
 
 
-class DriverOrderSerializer(serializers.ModelSerializer):
+class OrderListSerializer(OrderSerializer):
+    select_related_fields = {"customer": "customer", "driver": "driver"}
+
+    customer = CustomerSummarySerializer(read_only=True)
+    driver = UserSummarySerializer(read_only=True)
+
+    def to_representation(self, instance):
+        ret = super().to_representation(instance)
+        # Lists link the thumbnail; the full proof is on the detail view.
+        if "proof_image" in ret:
+            original = ret.pop("proof_image")
+            ret["proof_thumbnail"] = ret.get("proof_thumbnail") or original
+        return ret
+
+
+class DriverOrderSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    select_related_fields = {"customer": "customer"}
+
     customer = serializers.SerializerMethodField()
     
     class Meta:
         model = Order
         fields = [
-            "id", "customer", "delivery_time", "filled_amount", "proof_image",
+            "id", "customer", "delivery_time", "filled_amount", "proof_image", "proof_thumbnail",
             "problem_reason", "status", "created_at", "required_gallons", "customer_location"
         ]
         read_only_fields = [
@@ -207,7 +283,23 @@ class DriverOrderSerializer(serializers.ModelSerializer):
             "phone": obj.customer.phone
         }
     
-class RecheckInvoiceSerializer(serializers.ModelSerializer):
+class DriverManifestSerializer(serializers.ModelSerializer):
+    customer_name = serializers.CharField(source="customer.full_name", read_only=True)
+    customer_phone = serializers.CharField(source="customer.phone", read_only=True)
+
+    class Meta:
+        model = Order
+        fields = [
+            "id", "status", "delivery_time", "required_gallons", "filled_amount",
+            "customer_id", "customer_name", "customer_phone", "customer_location",
+            "proof_thumbnail", "problem_reason", "confirmed_at", "updated_at"
+        ]
+        read_only_fields = fields
+
+
+class RecheckInvoiceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    select_related_fields = {"customer_name": "customer", "customer_phone": "customer"}
+
     customer_name = serializers.CharField(source="customer.full_name", read_only=True)
     customer_phone = serializers.CharField(source="customer.phone", read_only=True)
     period_display = serializers.SerializerMethodField()
@@ -237,7 +329,17 @@ class RecheckInvoiceSerializer(serializers.ModelSerializer):
         return f"{obj.period_start.strftime('%d/%m/%Y')} → {obj.period_end.strftime('%d/%m/%Y')}"
 
 
-class FinalInvoiceSerializer(serializers.ModelSerializer):
+class FinalInvoiceSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    select_related_fields = {
+        "customer_name": "recheck__customer",
+        "customer_phone": "recheck__customer",
+        "period_start": "recheck",
+        "period_end": "recheck",
+        "total_trips": "recheck",
+        "total_gallons": "recheck",
+        "assigned_to": "recheck__assigned_to",
+    }
+
     customer_name = serializers.CharField(source="recheck.customer.full_name", read_only=True)
     customer_phone = serializers.CharField(source="recheck.customer.phone", read_only=True)
     period_start = serializers.DateField(source="recheck.period_start", read_only=True)
@@ -257,8 +359,80 @@ class FinalInvoiceSerializer(serializers.ModelSerializer):
             "notes", "created_by", "finalized_at"
         ]
         read_only_fields = ["subtotal", "vat_amount", "total", "finalized_at", "created_by"]
+
+
+class CustomerLedgerSerializer(serializers.ModelSerializer):
+    customer_name = serializers.CharField(source="customer.full_name", read_only=True)
+    customer_phone = serializers.CharField(source="customer.phone", read_only=True)
+    area = serializers.CharField(source="customer.area", read_only=True)
+    zone_number = serializers.CharField(source="customer.zone_number", read_only=True)
+
+    class Meta:
+        model = CustomerLedger
+        fields = [
+            "customer", "customer_name", "customer_phone", "area", "zone_number",
+            "invoiced", "invoice_count", "period_count", "gallons", "last_invoice_at", "updated_at",
+        ]
         
 
+class BulkFinalizeSerializer(serializers.Serializer):
+    GROUP_FIELDS = ["area", "zone_number", "property_type"]
+
+    rechecks = serializers.ListField(
+        child=serializers.IntegerField(), required=False, allow_empty=False,
+        max_length=settings.INVOICE_BULK_MAX_ITEMS
+    )
+    price_per_gallon = serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0"), required=False)
+    group_by = serializers.ChoiceField(choices=GROUP_FIELDS, required=False)
+    group_prices = serializers.DictField(
+        child=serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0")), required=False
+    )
+    recheck_prices = serializers.DictField(
+        child=serializers.DecimalField(max_digits=10, decimal_places=2, min_value=Decimal("0")), required=False
+    )
+    vat_percent = serializers.DecimalField(max_digits=5, decimal_places=2, min_value=Decimal("0"), required=False)
+    notes = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, attrs):
+        if attrs.get("group_prices") and not attrs.get("group_by"):
+            raise serializers.ValidationError("group_by is required with group_prices.")
+        if not (attrs.get("price_per_gallon") is not None or attrs.get("group_prices") or attrs.get("recheck_prices")):
+            raise serializers.ValidationError("Give price_per_gallon, group_prices or recheck_prices.")
+        if attrs.get("rechecks"):
+            attrs["rechecks"] = list(dict.fromkeys(attrs["rechecks"]))
+        return attrs
+
+
+class BulkFinalizeResultSerializer(serializers.Serializer):
+    # Amounts go out as strings, like FinalInvoiceSerializer's, so no
+    # float rounding creeps in between the database and the client.
+    recheck = serializers.IntegerField()
+    ok = serializers.BooleanField()
+    error = serializers.CharField(required=False)
+    invoice = serializers.IntegerField(required=False)
+    price_per_gallon = serializers.DecimalField(max_digits=10, decimal_places=2, required=False)
+    subtotal = serializers.DecimalField(max_digits=14, decimal_places=2, required=False)
+    vat_amount = serializers.DecimalField(max_digits=14, decimal_places=2, required=False)
+    total = serializers.DecimalField(max_digits=14, decimal_places=2, required=False)
+
+
+class BulkFinalizeResponseSerializer(serializers.Serializer):
+    created = serializers.IntegerField()
+    failed = serializers.IntegerField()
+    total = serializers.DecimalField(max_digits=16, decimal_places=2)
+    results = BulkFinalizeResultSerializer(many=True)
+
+
+class InvoicePdfBatchSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(), allow_empty=False, max_length=settings.INVOICE_PDF_BATCH_MAX_ITEMS
+    )
+    format = serializers.ChoiceField(choices=["pdf", "zip"], default="pdf")
+
+    def validate_ids(self, ids):
+        return list(dict.fromkeys(ids))
+
+
 class ComplaintSerializer(serializers.ModelSerializer):
     
     customer = serializers.SlugRelatedField(
@@ -284,4 +458,78 @@ class ComplaintSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError({"order": "This order does not belong to the selected customer."})
 
         return data
-    
\ No newline at end of file
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    params = serializers.DictField(required=False, default=dict)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            "id", "kind", "params", "status", "progress", "total",
+            "error", "created_at", "finished_at", "download_url",
+        ]
+        read_only_fields = ["id", "status", "progress", "total", "error", "created_at", "finished_at"]
+
+    def validate_kind(self, value):
+        from .export_jobs import EXPORT_KINDS
+        if value not in EXPORT_KINDS:
+            raise serializers.ValidationError(f"Unknown export kind. Choose one of: {', '.join(EXPORT_KINDS)}.")
+        return value
+
+    def get_download_url(self, obj):
+        request = self.context.get("request")
+        if obj.status != "done" or not request:
+            return None
+        return request.build_absolute_uri(f"/api/exports/{obj.id}/download/")
+
+
+class UploadSessionSerializer(serializers.ModelSerializer):
+    chunk_size = serializers.SerializerMethodField()
+
+    class Meta:
+        model = UploadSession
+        fields = ["id", "order", "filename", "content_type", "size", "offset", "status", "chunk_size", "created_at"]
+        read_only_fields = ["id", "offset", "status", "created_at"]
+
+    def validate_order(self, order):
+        request = self.context.get("request")
+        if not request or order.driver_id != request.user.id:
+            raise serializers.ValidationError("This order is not assigned to you.")
+        if order.status != "pending":
+            raise serializers.ValidationError("Order already confirmed or completed.")
+        return order
+
+    def validate_filename(self, value):
+        try:
+            return get_valid_filename(os.path.basename(value))
+        except SuspiciousFileOperation:
+            raise serializers.ValidationError("Invalid file name.")
+
+    def validate_size(self, value):
+        if not 0 < value <= settings.UPLOAD_SESSION_MAX_SIZE:
+            raise serializers.ValidationError(f"Size must be between 1 and {settings.UPLOAD_SESSION_MAX_SIZE} bytes.")
+        return value
+
+    def get_chunk_size(self, obj):
+        return settings.UPLOAD_SESSION_CHUNK_SIZE
+
+
+class DriverBatchItemSerializer(serializers.Serializer):
+    key = serializers.CharField(max_length=100)
+    order = serializers.IntegerField()
+    action = serializers.ChoiceField(choices=["confirm", "problem"])
+    filled_amount = serializers.IntegerField(min_value=1, required=False)
+    reason = serializers.CharField(max_length=255, required=False)
+    upload_id = serializers.UUIDField(required=False)
+
+
+class DriverBatchSerializer(serializers.Serializer):
+    items = DriverBatchItemSerializer(many=True, allow_empty=False, max_length=settings.DRIVER_BATCH_MAX_ITEMS)
+
+    def validate_items(self, items):
+        keys = [item["key"] for item in items]
+        if len(set(keys)) != len(keys):
+            raise serializers.ValidationError("Item keys must be unique within a batch.")
+        return items
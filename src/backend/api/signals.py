@@ -0,0 +1,126 @@
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Customer, Complaint, CustomerLedger, Order, FinalInvoice, RecheckAccumulator, RecheckInvoice
+from .artifacts import discard_artifacts
+from .metrics import invalidate_dashboard_metrics
+from .realtime import STAFF_GROUPS, driver_group, publish
+
+@receiver([post_save, post_delete], sender=Order)
+@receiver([post_save, post_delete], sender=FinalInvoice)
+@receiver([post_save, post_delete], sender=Customer)
+@receiver([post_save, post_delete], sender=Complaint)
+def invalidate_dashboard(sender, **kwargs):
+    transaction.on_commit(invalidate_dashboard_metrics)
+
+
+@receiver(post_delete, sender=FinalInvoice)
+def discard_invoice_artifacts(sender, instance, **kwargs):
+    invoice_id = instance.pk
+    transaction.on_commit(lambda: discard_artifacts(invoice_id))
+
+
+# Deletes, including cascades, bypass the models' save() bookkeeping.
+@receiver(post_delete, sender=Order)
+def unrecord_order_billing(sender, instance, **kwargs):
+    contribution = instance.billing_contribution()
+    if contribution:
+        customer_id, day, gallons = contribution
+        RecheckAccumulator.record(customer_id, day, -1, -gallons)
+
+
+@receiver(post_delete, sender=FinalInvoice)
+def unrecord_final_invoice(sender, instance, **kwargs):
+    customer_id = RecheckInvoice.objects.filter(pk=instance.recheck_id).values_list("customer_id", flat=True).first()
+    if customer_id is not None:
+        CustomerLedger.record_many([(customer_id, -instance.total, -1, 0, 0)])
+
+
+@receiver(post_delete, sender=RecheckInvoice)
+def unrecord_recheck(sender, instance, **kwargs):
+    CustomerLedger.record_many([(instance.customer_id, 0, 0, -1, -instance.total_gallons)])
+
+
+ORDER_EVENTS = {"confirmed": "order.confirmed", "problem": "order.problem"}
+
+
+def order_payload(order):
+    return {
+        "id": order.pk,
+        "status": order.status,
+        "customer_id": order.customer_id,
+        "driver_id": order.driver_id,
+        "delivery_date": order.delivery_date,
+        "delivery_time": order.delivery_time,
+        "filled_amount": order.filled_amount,
+        "confirmed_at": order.confirmed_at,
+        "problem_reason": order.problem_reason,
+    }
+
+
+def order_groups(order):
+    return STAFF_GROUPS + ([driver_group(order.driver_id)] if order.driver_id else [])
+
+
+def order_counts(order, sign):
+    delta = {"orders_total": sign}
+    if order.status == "pending":
+        delta["orders_pending"] = sign
+    if order.delivery_date == timezone.localdate():
+        delta["orders_today"] = sign
+    return delta
+
+
+def publish_order_change(order, previous):
+    # previous is None when the status wasn't loaded; send a plain update then.
+    changed = previous is not None and previous != order.status
+    delta = None
+    if changed and "pending" in (previous, order.status):
+        delta = {"orders_pending": 1 if order.status == "pending" else -1}
+    event = ORDER_EVENTS.get(order.status) if changed else None
+    publish(order_groups(order), event or "order.updated", order_payload(order), delta)
+
+
+@receiver(post_save, sender=Order)
+def publish_order(sender, instance, created, **kwargs):
+    previous = getattr(instance, "_loaded_status", None)
+    instance._loaded_status = instance.status
+    if created:
+        publish(order_groups(instance), "order.created", order_payload(instance), order_counts(instance, 1))
+        return
+    publish_order_change(instance, previous)
+
+
+@receiver(post_delete, sender=Order)
+def publish_order_deleted(sender, instance, **kwargs):
+    publish(order_groups(instance), "order.deleted", {"id": instance.pk}, order_counts(instance, -1))
+
+
+def complaint_payload(complaint):
+    return {
+        "id": complaint.pk,
+        "customer_id": complaint.customer_id,
+        "order_id": complaint.order_id,
+        "priority": complaint.priority,
+        "status": complaint.status,
+        "created_at": complaint.created_at,
+    }
+
+
+@receiver(post_save, sender=Complaint)
+def publish_complaint(sender, instance, created, **kwargs):
+    previous = None if created else getattr(instance, "_loaded_status", instance.status)
+    instance._loaded_status = instance.status
+    delta = None
+    if previous != instance.status and "new" in (previous, instance.status):
+        delta = {"complaints_new": 1 if instance.status == "new" else -1}
+    event = "complaint.created" if created else "complaint.updated"
+    publish(STAFF_GROUPS, event, complaint_payload(instance), delta)
+
+
+@receiver(post_delete, sender=Complaint)
+def publish_complaint_deleted(sender, instance, **kwargs):
+    delta = {"complaints_new": -1} if instance.status == "new" else None
+    publish(STAFF_GROUPS, "complaint.deleted", {"id": instance.pk}, delta)
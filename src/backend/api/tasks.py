@@ -1,93 +1,225 @@
+import logging
+import time
+from contextlib import contextmanager
 from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
 from django.utils import timezone
-from datetime import timedelta, datetime, date
-from .models import Customer, Order, RecheckInvoice
-from django.db.models import Sum
+from datetime import timedelta
+from django.db import transaction
+from .models import Customer, CustomerLedger, RecheckInvoice, RecheckAccumulator, ExportJob, UploadSession, DriverActionReceipt, recheck_period
+from .scheduling import materialize_orders
+from .images import optimize_proof_image
+from .uploads import purge_partial_files
+from .realtime import STAFF_GROUPS, publish
+from .metrics import invalidate_dashboard_metrics, rollup_daily_metrics
+from django.db.models import Max
 from dateutil.relativedelta import relativedelta
+from PIL import UnidentifiedImageError
+
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def task_lock(key, timeout=None):
+    # cache.add is atomic on Redis, so only one worker gets the lock and the
+    # others skip the run instead of racing it.
+    timeout = timeout or settings.CELERY_TASK_LOCK_TIMEOUT
+    acquired = cache.add(f"lock:{key}", "1", timeout)
+    try:
+        yield acquired
+    finally:
+        if acquired:
+            cache.delete(f"lock:{key}")
 
 
 @shared_task
 def generate_today_orders():
+    started = time.monotonic()
     today = timezone.localdate()
-    customers = Customer.objects.filter(weekly_trips__gt=0, delivery_days__isnull=False, delivery_time__isnull=False)
 
-   
-    existing_orders = Order.objects.filter(delivery_time__date=today)
-    existing_customers_ids = {o.customer_id for o in existing_orders}
+    with task_lock(f"generate_today_orders:{today.isoformat()}") as acquired:
+        if not acquired:
+            return "generate_today_orders already running, skipped"
+        scanned, created = materialize_orders(start=today, days=1)
+    invalidate_dashboard_metrics()
+    if created:
+        # Bulk inserts skip the per-order signals; tell dashboards to refetch.
+        publish(STAFF_GROUPS, "orders.generated", {"date": today, "created": created})
 
-    new_orders = []
+    elapsed = time.monotonic() - started
+    logger.info(
+        "generate_today_orders: scanned=%d created=%d elapsed=%.3fs",
+        scanned, created, elapsed,
+    )
+    return f"{created} orders created for today ({scanned} customers scanned in {elapsed:.3f}s)"
 
-    weekdays = ["monday","tuesday","wednesday","thursday","friday","saturday","sunday"]
-    today_weekday = weekdays[today.weekday()]  
 
-    for customer in customers:
-
-        if not any(day.lower() == today_weekday for day in customer.delivery_days):
-            continue
-
-        if customer.id in existing_customers_ids:
-            continue
+@shared_task
+def materialize_order_schedule(days=None):
+    started = time.monotonic()
+    today = timezone.localdate()
+    days = days or settings.ORDER_SCHEDULE_HORIZON_DAYS
 
-        delivery_datetime = datetime.combine(today, customer.delivery_time)
-        delivery_datetime = timezone.make_aware(delivery_datetime)
+    with task_lock(f"materialize_order_schedule:{today.isoformat()}") as acquired:
+        if not acquired:
+            return "materialize_order_schedule already running, skipped"
+        scanned, created = materialize_orders(start=today, days=days)
+    invalidate_dashboard_metrics()
 
-        new_orders.append(Order(
-            customer=customer,
-            driver=customer.driver,
-            delivery_time=delivery_datetime,
-            required_gallons=customer.gallons,
-            customer_location=customer.location_link,
-            status="pending"
-        ))
+    elapsed = time.monotonic() - started
+    logger.info(
+        "materialize_order_schedule: days=%d scanned=%d created=%d elapsed=%.3fs",
+        days, scanned, created, elapsed,
+    )
+    return f"{created} orders materialized for the next {days} days ({scanned} customer-days scanned in {elapsed:.3f}s)"
 
 
-    if new_orders:
-        Order.objects.bulk_create(new_orders)
-    
-    return f"{len(new_orders)} orders created for today"
+@shared_task
+def rollup_recent_metrics(days=2):
+    today = timezone.localdate()
+    with task_lock(f"rollup_recent_metrics:{days}") as acquired:
+        if not acquired:
+            return "rollup_recent_metrics already running, skipped"
+        rows = rollup_daily_metrics(today - timedelta(days=days - 1), today)
+    return f"{rows} daily metric rows refreshed"
 
 
 @shared_task
 def generate_recheck_invoices():
-    today = date.today()
-    customers = Customer.objects.exclude(starting_date__isnull=True)
-
-    for customer in customers:
-        start_date = customer.starting_date
-
-        last_invoice = RecheckInvoice.objects.filter(customer=customer).order_by("-period_end").first()
-
-        if last_invoice:
-           
-            current_start = last_invoice.period_end + timedelta(days=1)
-        else:
-            current_start = start_date
-
-        while current_start <= today:
-            current_end = current_start + relativedelta(days=29)
-            if current_end > today:
-               
-                break
-
-            orders = Order.objects.filter(
-                customer=customer,
-                created_at__date__gte=current_start,
-                created_at__date__lte=current_end,
-                status="confirmed"
-            )
+    today = timezone.localdate()
 
-            total_trips = orders.count()
-            total_gallons = orders.aggregate(Sum("filled_amount"))["filled_amount__sum"] or 0
-
-            RecheckInvoice.objects.get_or_create(
-                customer=customer,
-                period_start=current_start,
-                defaults={
-                    "period_end": current_end,
-                    "total_trips": total_trips,
-                    "total_gallons": total_gallons,
-                },
+    with task_lock(f"generate_recheck_invoices:{today.isoformat()}") as acquired:
+        if not acquired:
+            return "generate_recheck_invoices already running, skipped"
+
+        customers = (
+            Customer.objects.exclude(starting_date__isnull=True)
+            .annotate(last_period_end=Max("rechecks__period_end"))
+            .values_list("id", "starting_date", "last_period_end")
+        )
+
+        # Closed 30-day periods per customer, anchored on starting_date and
+        # continuing after the last recheck that already exists.
+        periods = {}
+        starting_dates = {}
+        for customer_id, starting_date, last_period_end in customers:
+            starting_dates[customer_id] = starting_date
+            current_start = last_period_end + timedelta(days=1) if last_period_end else starting_date
+            customer_periods = []
+            while current_start + relativedelta(days=29) <= today:
+                current_end = current_start + relativedelta(days=29)
+                customer_periods.append((current_start, current_end))
+                current_start = current_end + timedelta(days=1)
+            if customer_periods:
+                periods[customer_id] = customer_periods
+
+        if not periods:
+            return "0 recheck invoices created"
+
+        # Totals were kept up to date on every confirmation, so closing a
+        # period that lines up with its accumulator is just copying it onto
+        # the recheck. Periods that don't (the chain was started by hand, or
+        # starting_date changed since) are recounted from their own orders.
+        first_start = min(p[0][0] for p in periods.values())
+        last_start = max(p[-1][0] for p in periods.values())
+        accumulated = {
+            (customer_id, period_start, period_end): (trips, gallons)
+            for customer_id, period_start, period_end, trips, gallons in RecheckAccumulator.objects.filter(
+                period_start__gte=first_start, period_start__lte=last_start
+            ).values_list("customer_id", "period_start", "period_end", "total_trips", "total_gallons")
+        }
+        unaligned = [
+            (customer_id, period_start, period_end)
+            for customer_id, customer_periods in periods.items()
+            for period_start, period_end in customer_periods
+            if recheck_period(starting_dates[customer_id], period_start) != (period_start, period_end)
+        ]
+        totals = {**accumulated, **RecheckAccumulator.recount(unaligned)}
+
+        rechecks = [
+            RecheckInvoice(
+                customer_id=customer_id,
+                period_start=period_start,
+                period_end=period_end,
+                total_trips=totals.get((customer_id, period_start, period_end), (0, 0))[0],
+                total_gallons=totals.get((customer_id, period_start, period_end), (0, 0))[1],
+            )
+            for customer_id, customer_periods in periods.items()
+            for period_start, period_end in customer_periods
+        ]
+        with transaction.atomic():
+            # Only rechecks that are actually inserted may reach the ledger.
+            existing = set(RecheckInvoice.objects.filter(
+                period_start__gte=first_start, period_start__lte=last_start
+            ).values_list("customer_id", "period_start"))
+            rechecks = [recheck for recheck in rechecks if (recheck.customer_id, recheck.period_start) not in existing]
+            RecheckInvoice.objects.bulk_create(rechecks, batch_size=1000, ignore_conflicts=True)
+            # bulk_create skips RecheckInvoice.save(); move the ledger here.
+            CustomerLedger.record_many(
+                (recheck.customer_id, 0, 0, 1, recheck.total_gallons) for recheck in rechecks
             )
 
-        
-            current_start = current_end + timedelta(days=1)
\ No newline at end of file
+    return f"{len(rechecks)} recheck invoices created"
+
+
+@shared_task
+def run_export_job(job_id):
+    from .export_jobs import run_export
+
+    job = ExportJob.objects.select_related("created_by").get(pk=job_id)
+    if job.status != "pending":
+        return f"export {job_id} already {job.status}"
+
+    job.status = "running"
+    job.save(update_fields=["status"])
+    try:
+        run_export(job)
+    except Exception as exc:
+        logger.exception("export %s failed", job_id)
+        job.status = "failed"
+        job.error = str(exc)
+    else:
+        job.status = "done"
+    job.finished_at = timezone.now()
+    job.save()
+    return f"export {job_id} {job.status}"
+
+
+@shared_task
+def purge_export_jobs():
+    cutoff = timezone.now() - timedelta(seconds=settings.EXPORT_JOB_RETENTION)
+    expired = ExportJob.objects.filter(created_at__lt=cutoff)
+    for job in expired.exclude(file="").exclude(file__isnull=True).iterator():
+        job.file.delete(save=False)
+    deleted, _ = expired.delete()
+    return f"{deleted} export jobs purged"
+
+
+@shared_task
+def process_proof_image(order_id):
+    try:
+        result = optimize_proof_image(order_id)
+    except (UnidentifiedImageError, OSError):
+        # Keep the upload as it is; it still serves as the proof.
+        logger.warning("proof image of order %s could not be processed", order_id, exc_info=True)
+        return f"order {order_id} proof kept as uploaded"
+    if result is None:
+        return f"order {order_id} has no proof to process"
+    return f"order {order_id} proof {result[0]} → {result[1]} bytes"
+
+
+@shared_task
+def purge_upload_sessions():
+    cutoff = timezone.now() - timedelta(seconds=settings.UPLOAD_SESSION_TTL)
+    deleted, _ = UploadSession.objects.filter(updated_at__lt=cutoff).delete()
+    removed = purge_partial_files(cutoff)
+    return f"{deleted} upload sessions purged, {removed} partial files removed"
+
+
+@shared_task
+def purge_action_receipts():
+    cutoff = timezone.now() - timedelta(seconds=settings.DRIVER_ACTION_RECEIPT_RETENTION)
+    deleted, _ = DriverActionReceipt.objects.filter(created_at__lt=cutoff).delete()
+    return f"{deleted} driver action receipts purged"
@@ -1,3 +1,608 @@
-from django.test import TestCase
+import os
+import tempfile
+from io import StringIO
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from unittest import mock, skipUnless
+from asgiref.sync import async_to_sync
+from channels.layers import get_channel_layer
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APIClient
 
-# Create your tests here.
+from api import uploads as api_uploads
+from api.artifacts import open_artifact
+from api.metrics import daily_series
+from api.realtime import publish
+from api.scheduling import build_order, materialize_orders
+from api.search import restore_search_triggers
+from api.models import User, Customer, Order, RecheckInvoice, FinalInvoice, Complaint, DailyMetrics, UploadSession
+from api.tasks import generate_recheck_invoices
+
+
+# Tests run without Redis: locks and counters use the local-memory cache
+# and realtime events the in-memory channel layer.
+LOCAL_SERVICES = override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}},
+    CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}},
+)
+
+
+def temporary_dir_setting(test, name):
+    """Point setting ``name`` at a directory removed after ``test``."""
+    directory = tempfile.TemporaryDirectory()
+    test.addCleanup(directory.cleanup)
+    override = override_settings(**{name: directory.name})
+    override.enable()
+    test.addCleanup(override.disable)
+    return directory.name
+
+
+def make_customers(count, driver=None, **fields):
+    return Customer.objects.bulk_create([
+        Customer(full_name=f"Customer {index}", phone=f"0500{index:06d}", driver=driver, **fields)
+        for index in range(count)
+    ])
+
+
+def make_orders(customers, days, driver=None, status="confirmed"):
+    start = timezone.localdate() - timedelta(days=days)
+    orders = []
+    for offset in range(days):
+        day = start + timedelta(days=offset)
+        delivery_time = timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=9)
+        for customer in customers:
+            orders.append(Order(
+                customer=customer,
+                driver=driver,
+                delivery_time=delivery_time,
+                delivery_date=day,
+                required_gallons=100,
+                filled_amount=100 if status == "confirmed" else None,
+                confirmed_at=delivery_time if status == "confirmed" else None,
+                status=status,
+            ))
+    return Order.objects.bulk_create(orders)
+
+
+@LOCAL_SERVICES
+class ExportQueryCountTests(TestCase):
+    ROWS = 1000
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="admin")
+        cls.driver = User.objects.create_user("driver", password="x", role="driver")
+        customers = make_customers(50, driver=cls.driver, area="North")
+        orders = make_orders(customers, cls.ROWS // len(customers), driver=cls.driver)
+        Complaint.objects.bulk_create([
+            Complaint(customer=order.customer, order=order, issue="Late delivery") for order in orders
+        ])
+        RecheckInvoice.objects.bulk_create([
+            RecheckInvoice(
+                customer=customer,
+                period_start=date(2026, 1, 1) + timedelta(days=30 * period),
+                period_end=date(2026, 1, 30) + timedelta(days=30 * period),
+            )
+            for customer in customers
+            for period in range(cls.ROWS // len(customers))
+        ])
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+    def assertExportQueries(self, url, count):
+        with self.assertNumQueries(count):
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            b"".join(response.streaming_content)
+
+    def test_exports_read_1k_rows_in_one_query(self):
+        for url in [
+            "/api/orders/export_excel/",
+            "/api/complaints/export_excel/",
+            "/api/rechecks/export_excel/",
+            "/api/customers/export_excel/",
+        ]:
+            with self.subTest(url=url):
+                self.assertExportQueries(url, 1)
+
+
+@LOCAL_SERVICES
+class ListQueryCountTests(TestCase):
+    """A page of 20 rows costs the same handful of queries whatever the
+    serializer nests, with or without a ``?fields=`` sparse fieldset."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="admin")
+        cls.driver = User.objects.create_user("driver", password="x", role="driver")
+        cls.accountant = User.objects.create_user("accountant", password="x", role="accountant")
+        customers = make_customers(30, driver=cls.driver, area="North")
+        make_orders(customers, 2, driver=cls.driver)
+        rechecks = RecheckInvoice.objects.bulk_create([
+            RecheckInvoice(
+                customer=customer,
+                assigned_to=cls.accountant,
+                period_start=date(2026, 1, 1),
+                period_end=date(2026, 1, 30),
+                total_trips=2,
+                total_gallons=200,
+                status="sent",
+            )
+            for customer in customers
+        ])
+        FinalInvoice.objects.bulk_create([
+            FinalInvoice(recheck=recheck, created_by=cls.accountant, price_per_gallon=Decimal("0.35"))
+            for recheck in rechecks
+        ])
+
+    def assertListQueries(self, user, url, count, keys=None):
+        client = APIClient()
+        client.force_authenticate(user)
+        with self.assertNumQueries(count):
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data["results"]), 20)
+        if keys is not None:
+            self.assertEqual({key for row in response.data["results"] for key in row}, set(keys))
+
+    def test_order_list(self):
+        self.assertListQueries(self.admin, "/api/orders/", 2)
+        self.assertListQueries(self.admin, "/api/orders/?fields=id,status,customer", 2, ["id", "status", "customer"])
+
+    def test_driver_order_list(self):
+        self.assertListQueries(self.driver, "/api/driver/orders/", 2)
+        self.assertListQueries(self.driver, "/api/driver/orders/?fields=id,status", 2, ["id", "status"])
+
+    def test_recheck_list(self):
+        self.assertListQueries(self.admin, "/api/rechecks/", 2)
+        self.assertListQueries(self.admin, "/api/rechecks/?fields=id,status", 2, ["id", "status"])
+        self.assertListQueries(self.admin, "/api/rechecks/?fields=id,customer_name", 2, ["id", "customer_name"])
+
+    def test_invoice_list(self):
+        self.assertListQueries(self.accountant, "/api/accountant/invoices/", 2)
+        self.assertListQueries(self.accountant, "/api/accountant/invoices/?fields=id,total", 2, ["id", "total"])
+        self.assertListQueries(
+            self.accountant, "/api/accountant/invoices/?fields=id,customer_name,assigned_to", 2,
+            ["id", "customer_name", "assigned_to"],
+        )
+
+
+@LOCAL_SERVICES
+class RecheckGenerationQueryCountTests(TestCase):
+    """Closing recheck periods costs the same queries for 10 customers as
+    for 50. (SQLite splits inserts at its 999-parameter limit, about 110
+    rechecks, so the larger run stays below that.)"""
+
+    def generate_for(self, customers):
+        make_customers(customers, starting_date=timezone.localdate() - timedelta(days=65))
+        with self.assertNumQueries(8):
+            generate_recheck_invoices()
+        self.assertEqual(RecheckInvoice.objects.count(), customers * 2)
+
+    def test_10_customers(self):
+        self.generate_for(10)
+
+    def test_50_customers(self):
+        self.generate_for(50)
+
+
+@LOCAL_SERVICES
+class DailySeriesTests(TestCase):
+    """Days the nightly rollup hasn't reached are rolled up on first read."""
+
+    def test_unrolled_days_are_filled_in(self):
+        make_orders(make_customers(3), 60)
+        first_day = timezone.localdate() - timedelta(days=90)
+        yesterday = timezone.localdate() - timedelta(days=1)
+
+        rows = daily_series(first_day, yesterday)
+        self.assertEqual(len(rows), 90)
+        self.assertEqual(sum(metrics.orders_total for metrics in rows), 180)
+        self.assertEqual(DailyMetrics.objects.count(), 90)
+
+        with self.assertNumQueries(1):
+            self.assertEqual(len(daily_series(first_day, yesterday)), 90)
+
+    def test_chart_span_is_capped(self):
+        client = APIClient()
+        client.force_authenticate(User.objects.create_user("admin", password="x", role="admin"))
+        response = client.get("/api/dashboard/chart/", {"start": "0001-01-01"})
+        self.assertEqual(response.status_code, 400)
+        self.assertFalse(DailyMetrics.objects.exists())
+        self.assertEqual(client.get("/api/dashboard/chart/", {"period": "90d"}).status_code, 200)
+
+
+@LOCAL_SERVICES
+class MaterializeOrdersTests(TestCase):
+    def test_orders_inserted_by_an_overlapping_run_are_not_counted(self):
+        first, second = make_customers(
+            2, weekly_trips=7, delivery_weekdays=127, delivery_time=time(9), gallons=100,
+        )
+        day = timezone.localdate()
+
+        def overlapping_run(day, customer_id, *row):
+            if customer_id == first.pk:
+                Order.objects.create(customer=first, delivery_time=timezone.now(), required_gallons=100)
+            return build_order(day, customer_id, *row)
+
+        with mock.patch("api.scheduling.build_order", side_effect=overlapping_run):
+            self.assertEqual(materialize_orders(start=day, days=1), (2, 1))
+        self.assertEqual(Order.objects.filter(delivery_date=day).count(), 2)
+
+
+class RealtimeListener:
+    def listen(self):
+        self.layer = get_channel_layer()
+        self.channel = async_to_sync(self.layer.new_channel)()
+        async_to_sync(self.layer.group_add)("role.admin", self.channel)
+
+    def received(self):
+        return [event["type"] for event in async_to_sync(self.layer.receive)(self.channel)["events"]]
+
+
+@LOCAL_SERVICES
+class RealtimeBatchTests(RealtimeListener, TestCase):
+    """Events go out in one batch when the transaction commits."""
+
+    def test_savepoint_rollback_drops_only_its_own_events(self):
+        self.listen()
+        with self.captureOnCommitCallbacks(execute=True):
+            with transaction.atomic():
+                with transaction.atomic():
+                    publish(["role.admin"], "order.created")
+                try:
+                    with transaction.atomic():
+                        publish(["role.admin"], "order.updated")
+                        raise RuntimeError
+                except RuntimeError:
+                    pass
+                publish(["role.admin"], "complaint.created")
+        self.assertEqual(self.received(), ["order.created", "complaint.created"])
+
+
+@LOCAL_SERVICES
+class RealtimeRollbackTests(RealtimeListener, TransactionTestCase):
+    """Events from a rolled-back transaction never join a later batch."""
+
+    def roll_back(self, event_type):
+        try:
+            with transaction.atomic():
+                publish(["role.admin"], event_type)
+                raise RuntimeError
+        except RuntimeError:
+            pass
+
+    def test_next_publish_outside_a_transaction(self):
+        self.listen()
+        self.roll_back("order.created")
+        publish(["role.admin"], "order.deleted")
+        self.assertEqual(self.received(), ["order.deleted"])
+
+    def test_next_publish_inside_a_transaction(self):
+        self.listen()
+        self.roll_back("rolled.back")
+        with transaction.atomic():
+            publish(["role.admin"], "order.created")
+        self.assertEqual(self.received(), ["order.created"])
+
+
+class ArtifactTests(TestCase):
+    def setUp(self):
+        temporary_dir_setting(self, "INVOICE_ARTIFACT_ROOT")
+
+    def test_newer_artifact_does_not_pull_an_open_one_away(self):
+        with open_artifact("pdf", 1, "old", lambda fileobj: fileobj.write(b"old")) as rendered:
+            self.assertEqual(rendered.read(), b"old")
+        reader = open_artifact("pdf", 1, "old", self.fail)
+        self.addCleanup(reader.close)
+        open_artifact("pdf", 1, "new", lambda fileobj: fileobj.write(b"new")).close()
+        self.assertEqual(reader.read(), b"old")
+
+        with open_artifact("pdf", 1, "old", lambda fileobj: fileobj.write(b"again")) as rendered:
+            self.assertEqual(rendered.read(), b"again")
+
+
+@LOCAL_SERVICES
+class RecheckPeriodTests(TestCase):
+    """Closed rechecks and drafts get the orders confirmed inside their own
+    range, even when it doesn't line up with the starting_date periods."""
+
+    def setUp(self):
+        self.today = timezone.localdate()
+
+    def confirm_on(self, customer, day):
+        order = Order.objects.create(
+            customer=customer,
+            delivery_time=timezone.make_aware(datetime.combine(day, datetime.min.time())) + timedelta(hours=9),
+            required_gallons=100,
+        )
+        order.status = "confirmed"
+        order.filled_amount = 100
+        order.save()
+
+    def recheck(self, customer, start):
+        return RecheckInvoice.objects.get(customer=customer, period_start=start)
+
+    def test_hand_made_draft_is_not_credited_past_its_end(self):
+        start = self.today - timedelta(days=70)
+        customer = make_customers(1, starting_date=start)[0]
+        RecheckInvoice.objects.create(customer=customer, period_start=start, period_end=start + timedelta(days=14))
+        self.confirm_on(customer, start + timedelta(days=20))
+        self.assertEqual(self.recheck(customer, start).total_trips, 0)
+
+        generate_recheck_invoices()
+        self.assertEqual(self.recheck(customer, start + timedelta(days=15)).total_trips, 1)
+
+    def test_changed_starting_date(self):
+        start = self.today - timedelta(days=100)
+        customer = make_customers(1, starting_date=start)[0]
+        RecheckInvoice.objects.create(customer=customer, period_start=start, period_end=start + timedelta(days=29))
+        Customer.objects.filter(pk=customer.pk).update(starting_date=start + timedelta(days=10))
+        self.confirm_on(customer, start + timedelta(days=40))
+
+        generate_recheck_invoices()
+        closed = self.recheck(customer, start + timedelta(days=30))
+        self.assertEqual((closed.total_trips, closed.total_gallons), (1, 100))
+
+    def test_reconcile_fixes_drafts(self):
+        start = self.today - timedelta(days=20)
+        customer = make_customers(1, starting_date=start)[0]
+        self.confirm_on(customer, start + timedelta(days=3))
+        RecheckInvoice.objects.create(customer=customer, period_start=start, period_end=start + timedelta(days=9), total_trips=5)
+
+        call_command("reconcile_rechecks", "--fix", stdout=StringIO())
+        draft = self.recheck(customer, start)
+        self.assertEqual((draft.total_trips, draft.total_gallons), (1, 100))
+
+
+@LOCAL_SERVICES
+class LegacyDuplicateOrderTests(TestCase):
+    """Same-day duplicates the delivery_date backfills left without a day
+    can still be confirmed and reported; they keep no day of their own."""
+
+    def setUp(self):
+        temporary_dir_setting(self, "MEDIA_ROOT")
+        self.driver = User.objects.create_user("driver", password="x", role="driver")
+        customer = make_customers(1, driver=self.driver)[0]
+        first = make_orders([customer], 1, driver=self.driver, status="pending")[0]
+        self.duplicate = Order.objects.bulk_create([Order(
+            customer=customer, driver=self.driver, delivery_time=first.delivery_time, required_gallons=100,
+        )])[0]
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+
+    def test_confirm(self):
+        response = self.client.post(f"/api/driver/orders/{self.duplicate.pk}/confirm/", {
+            "filled_amount": 100,
+            "proof_image": SimpleUploadedFile("proof.jpg", b"proof", content_type="image/jpeg"),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.duplicate.refresh_from_db()
+        self.assertEqual((self.duplicate.status, self.duplicate.delivery_date), ("confirmed", None))
+
+    def test_problem(self):
+        response = self.client.post(f"/api/driver/orders/{self.duplicate.pk}/problem/", {"reason": "Gate locked"})
+        self.assertEqual(response.status_code, 200)
+        self.duplicate.refresh_from_db()
+        self.assertEqual((self.duplicate.status, self.duplicate.delivery_date), ("problem", None))
+
+
+@LOCAL_SERVICES
+class DriverBatchTests(TestCase):
+    def setUp(self):
+        self.media = temporary_dir_setting(self, "MEDIA_ROOT")
+        temporary_dir_setting(self, "UPLOAD_SESSION_ROOT")
+        self.driver = User.objects.create_user("driver", password="x", role="driver")
+        customers = make_customers(2, driver=self.driver)
+        self.first, self.second = make_orders(customers, 1, driver=self.driver, status="pending")
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+
+    def completed_upload(self, order):
+        upload = UploadSession.objects.create(
+            order=order, driver=self.driver, filename="proof.jpg", size=5, offset=5, status="complete",
+        )
+        os.makedirs(os.path.dirname(upload.path), exist_ok=True)
+        with open(upload.path, "wb") as partial:
+            partial.write(b"proof")
+        return upload
+
+    def confirm(self, order, **item):
+        return self.client.post("/api/driver/orders/batch/", {
+            "items": [{"key": f"confirm-{order.pk}", "order": order.pk, "action": "confirm", "filled_amount": 100, **item}],
+        }, format="json")
+
+    def test_upload_proves_only_its_own_order(self):
+        upload = self.completed_upload(self.first)
+        response = self.confirm(self.second, upload_id=str(upload.pk))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data["results"][0]["error"], "Upload not found or not complete")
+        self.second.refresh_from_db()
+        self.assertEqual(self.second.status, "pending")
+
+        response = self.confirm(self.first, upload_id=str(upload.pk))
+        self.assertTrue(response.data["results"][0]["ok"])
+
+    def test_failed_batch_leaves_no_proof_and_is_not_retryable(self):
+        upload = self.completed_upload(self.first)
+        with mock.patch("api.batch.RecheckAccumulator.record_many", side_effect=IntegrityError), \
+                self.assertLogs("api.views.orders", "ERROR"):
+            response = self.confirm(self.first, upload_id=str(upload.pk))
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual([files for _, _, files in os.walk(self.media) if files], [])
+        self.first.refresh_from_db()
+        self.assertEqual(self.first.status, "pending")
+
+
+@LOCAL_SERVICES
+class UploadSessionTests(TestCase):
+    def setUp(self):
+        self.root = temporary_dir_setting(self, "UPLOAD_SESSION_ROOT")
+        self.driver = User.objects.create_user("driver", password="x", role="driver")
+        order = make_orders(make_customers(1, driver=self.driver), 1, driver=self.driver, status="pending")[0]
+        self.upload = UploadSession.objects.create(order=order, driver=self.driver, filename="proof.jpg", size=10)
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+
+    def send(self, data, offset):
+        return self.client.generic(
+            "PATCH", f"/api/driver/uploads/{self.upload.pk}/", data,
+            content_type="application/offset+octet-stream", HTTP_UPLOAD_OFFSET=str(offset),
+        )
+
+    def test_chunks_resume_from_the_offset(self):
+        self.assertEqual(self.send(b"proof", 0).data["offset"], 5)
+        self.assertEqual(self.send(b"proof", 0).status_code, 409)
+        self.assertEqual(self.send(b"image", 5).data["status"], "complete")
+        with open(self.upload.path, "rb") as partial:
+            self.assertEqual(partial.read(), b"proofimage")
+        self.assertEqual(os.listdir(self.root), [os.path.basename(self.upload.path)])
+
+    def test_offset_is_checked_again_after_spooling(self):
+        spool_chunk = api_uploads.spool_chunk
+
+        def racing_request(stream, limit):
+            # Another request lands its chunk while this one is still spooling.
+            UploadSession.objects.filter(pk=self.upload.pk).update(offset=5)
+            return spool_chunk(stream, limit)
+
+        with mock.patch("api.views.uploads.spool_chunk", side_effect=racing_request):
+            response = self.send(b"proof", 0)
+        self.assertEqual((response.status_code, response.data["offset"]), (409, 5))
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_oversized_chunk_leaves_nothing_behind(self):
+        self.assertEqual(self.send(b"x" * 11, 0).status_code, 400)
+        self.assertEqual(os.listdir(self.root), [])
+        self.upload.refresh_from_db()
+        self.assertEqual(self.upload.offset, 0)
+
+
+@LOCAL_SERVICES
+@override_settings(DRIVER_MANIFEST_SYNC_OVERLAP=0)
+class DriverManifestTests(TestCase):
+    def setUp(self):
+        self.driver = User.objects.create_user("driver", password="x", role="driver")
+        self.customer, other = make_customers(2, driver=self.driver)
+        self.order, self.other = make_orders([self.customer, other], 1, driver=self.driver, status="pending")
+        Order.objects.filter(pk=self.order.pk).update(updated_at=timezone.now() - timedelta(hours=1))
+        self.client = APIClient()
+        self.client.force_authenticate(self.driver)
+
+    def manifest(self, **params):
+        return self.client.get("/api/driver/orders/manifest/", {"date": self.order.delivery_date, **params})
+
+    def delta(self, token):
+        return {order["id"]: order["customer_phone"] for order in self.manifest(since=token).data["orders"]}
+
+    def test_customer_edits_reach_delta_sync(self):
+        token = self.manifest().data["token"]
+        self.assertNotIn(self.order.pk, self.delta(token))
+
+        customer = Customer.objects.get(pk=self.customer.pk)
+        customer.phone = "0599999999"
+        customer.save()
+        self.assertEqual(self.delta(token).get(self.order.pk), "0599999999")
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user("admin", password="x", role="admin")
+        driver = User.objects.create_user("khalid.driver", password="x", role="driver")
+        customers = Customer.objects.bulk_create([
+            Customer(full_name="Layla Haddad", phone="0501112222", driver=driver),
+            Customer(full_name="Omar Saleh", phone="0503334444"),
+        ])
+        make_orders(customers, 2)
+        Order.objects.filter(customer=customers[0]).update(driver=driver)
+
+    def search(self, url, term):
+        client = APIClient()
+        client.force_authenticate(self.admin)
+        response = client.get(url, {"search": term})
+        self.assertEqual(response.status_code, 200)
+        return response.data["results"]
+
+    def test_order_search_across_customer_and_driver(self):
+        self.assertEqual(len(self.search("/api/orders/", "Haddad")), 2)
+        self.assertEqual(len(self.search("/api/orders/", "khalid")), 2)
+        self.assertEqual(len(self.search("/api/orders/", "Saleh")), 2)
+        self.assertEqual(len(self.search("/api/orders/", "Omar khalid")), 0)
+
+    @skipUnless(connection.vendor == "sqlite", "FTS5 triggers exist on SQLite only")
+    def test_triggers_are_restored_after_a_table_is_remade(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT count(*) FROM sqlite_master WHERE name = 'api_customer_fts'")
+            if not cursor.fetchone()[0]:
+                self.skipTest("SQLite built without FTS5")
+            # What remaking api_customer in a migration does to its triggers.
+            for suffix in ("ai", "ad", "au"):
+                cursor.execute(f"DROP TRIGGER api_customer_fts_{suffix}")
+        Customer.objects.create(full_name="Mariam Nasser", phone="0505556666")
+        self.assertEqual(self.search("/api/customers/", "Nasser"), [])
+
+        restore_search_triggers(sender=None, using=connection.alias)
+        self.assertEqual(len(self.search("/api/customers/", "Nasser")), 1)
+        Customer.objects.create(full_name="Yousef Nasser", phone="0507778888")
+        self.assertEqual(len(self.search("/api/customers/", "Nasser")), 2)
+
+
+@skipUnless(connection.vendor == "postgresql", "EXPLAIN plans are checked on PostgreSQL")
+@LOCAL_SERVICES
+class OrderIndexPlanTests(TestCase):
+    """The hot Order, Complaint and FinalInvoice filters are answered from
+    their indexes. Sequential scans are switched off for the test so the
+    tiny test tables don't make the planner skip them."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.driver = User.objects.create_user("driver", password="x", role="driver")
+        cls.customers = make_customers(20, driver=cls.driver)
+        make_orders(cls.customers, 5, driver=cls.driver)
+
+    def setUp(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+
+    def assertUsesIndex(self, queryset, *names):
+        plan = queryset.explain()
+        self.assertTrue(any(name in plan for name in names), plan)
+
+    def test_driver_history(self):
+        self.assertUsesIndex(Order.objects.filter(driver=self.driver).order_by("-created_at")[:20], "order_driver_created")
+
+    def test_customer_status_range(self):
+        since = timezone.now() - timedelta(days=30)
+        self.assertUsesIndex(
+            Order.objects.filter(customer=self.customers[0], status="confirmed", created_at__gte=since),
+            "order_customer_status_created",
+        )
+
+    def test_order_list_page(self):
+        self.assertUsesIndex(Order.objects.order_by("-created_at", "id")[:20], "order_created")
+
+    def test_pending_orders_for_day(self):
+        self.assertUsesIndex(
+            Order.objects.filter(status="pending", delivery_date=timezone.localdate()),
+            "order_pending", "order_status_delivery_date",
+        )
+
+    def test_status_counts_by_day(self):
+        self.assertUsesIndex(
+            Order.objects.filter(status="confirmed", delivery_date__gte=timezone.localdate() - timedelta(days=7)),
+            "order_status_delivery_date",
+        )
+
+    def test_new_complaints(self):
+        self.assertUsesIndex(Complaint.objects.filter(status="new").order_by("-created_at")[:20], "complaint_status_created")
+
+    def test_invoices_finalized_today(self):
+        start = timezone.now().replace(hour=0, minute=0, second=0, microsecond=0)
+        self.assertUsesIndex(
+            FinalInvoice.objects.filter(finalized_at__gte=start, finalized_at__lt=start + timedelta(days=1)),
+            "finalized_at",
+        )
@@ -0,0 +1,70 @@
+import os
+import shutil
+import tempfile
+from django.conf import settings
+from django.core.files import File
+
+READ_SIZE = 64 * 1024
+
+
+def spool_chunk(stream, limit):
+    """Copy ``stream`` into a temporary file next to the partial files,
+    reading at most ``limit`` bytes and never holding more than one read in
+    memory. Returns the file rewound, removed once closed; raises ValueError
+    if the stream carries more than ``limit`` bytes."""
+    os.makedirs(settings.UPLOAD_SESSION_ROOT, exist_ok=True)
+    spool = tempfile.NamedTemporaryFile(dir=settings.UPLOAD_SESSION_ROOT, suffix=".chunk")
+    written = 0
+    while True:
+        data = stream.read(min(READ_SIZE, limit - written + 1))
+        if not data:
+            break
+        if written + len(data) > limit:
+            spool.close()
+            raise ValueError("Chunk runs past the declared upload size")
+        spool.write(data)
+        written += len(data)
+    spool.seek(0)
+    return spool
+
+
+def write_chunk(path, chunk, offset):
+    """Copy the spooled ``chunk`` into the partial file at ``path`` starting
+    at ``offset``. Returns the number of bytes written."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "r+b" if os.path.exists(path) else "wb") as partial:
+        partial.seek(offset)
+        # Drops bytes past the acknowledged offset left by an interrupted write.
+        partial.truncate()
+        shutil.copyfileobj(chunk, partial, READ_SIZE)
+        return partial.tell() - offset
+
+
+def open_upload(session):
+    """The assembled upload as a File named after the client's file."""
+    return File(open(session.path, "rb"), name=session.filename)
+
+
+def discard_upload(session):
+    try:
+        os.remove(session.path)
+    except FileNotFoundError:
+        pass
+
+
+def upload_offset(request):
+    value = request.headers.get("Upload-Offset", request.query_params.get("offset"))
+    return int(value) if value is not None and value.isdigit() else None
+
+
+def purge_partial_files(cutoff):
+    """Delete partial files untouched since ``cutoff``, including those whose
+    session went away with its order."""
+    if not os.path.isdir(settings.UPLOAD_SESSION_ROOT):
+        return 0
+    removed = 0
+    for entry in os.scandir(settings.UPLOAD_SESSION_ROOT):
+        if entry.is_file() and entry.stat().st_mtime < cutoff.timestamp():
+            os.remove(entry.path)
+            removed += 1
+    return removed
@@ -4,9 +4,11 @@ from .views.auth import LoginView, LogoutView, CheckAuthView
 from .views.users import UserViewSet
 from .views.orders import OrderViewSet, DriverOrderViewSet
 from .views.customers import CustomerViewSet
-from .views.invoices import AdminRecheckViewSet, AccountantInvoiceViewSet
+from .views.invoices import AdminRecheckViewSet, AccountantInvoiceViewSet, CustomerLedgerViewSet
 from .views.dashboard import DashboardViewSet
 from .views.complaints import ComplaintViewSet
+from .views.exports import ExportJobViewSet
+from .views.uploads import UploadSessionViewSet
 from .views import views
 from rest_framework_simplejwt.views import TokenRefreshView
 from rest_framework.routers import DefaultRouter
@@ -17,10 +19,13 @@ router.register(r'users', UserViewSet, basename='user')
 router.register(r'customers', CustomerViewSet, basename='customer')
 router.register(r'orders', OrderViewSet, basename='order')
 router.register(r'driver/orders', DriverOrderViewSet, basename='driver-orders')
+router.register(r'driver/uploads', UploadSessionViewSet, basename='driver-uploads')
 router.register(r"rechecks", AdminRecheckViewSet, basename="admin-rechecks")
 router.register(r"accountant/invoices", AccountantInvoiceViewSet, basename="accountant-invoices")
+router.register(r"ledger", CustomerLedgerViewSet, basename="customer-ledger")
 router.register(r"complaints", ComplaintViewSet, basename="complaint")
 router.register(r'dashboard', DashboardViewSet, basename='dashboard')
+router.register(r'exports', ExportJobViewSet, basename='export-jobs')
 
 
 
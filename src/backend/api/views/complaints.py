@@ -2,26 +2,42 @@ from rest_framework import viewsets, filters
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
 from rest_framework.response import Response
 from rest_framework import status
-from openpyxl import Workbook
+
+from api.exports import ExcelExportMixin, ExportSpec, Column, format_datetime
 
 from api.models import Complaint
 from api.serializers import ComplaintSerializer
 from api.permissions import IsAdminOrManager
+from api.search import IndexedSearchFilter
+from api.pagination import OptionalCursorPagination
+
 
+COMPLAINT_EXPORT = ExportSpec("complaints.xlsx", "Complaints", [
+    Column("ID", "id"),
+    Column("Customer", "customer__full_name", lambda name: name or ""),
+    Column("Phone", "customer__phone", lambda phone: phone or ""),
+    Column("Issue", "issue"),
+    Column("Priority", "priority"),
+    Column("Status", "status"),
+    Column("Date", "created_at", format_datetime),
+    Column("Order", "order_id", lambda order_id: order_id or ""),
+])
 
-class ComplaintViewSet(viewsets.ModelViewSet):
-    queryset = Complaint.objects.all()
+
+class ComplaintViewSet(ExcelExportMixin, viewsets.ModelViewSet):
+    queryset = Complaint.objects.select_related("customer")
     serializer_class = ComplaintSerializer
     permission_classes = [IsAuthenticated, IsAdminOrManager]
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     filterset_fields = ["status", "priority", "customer"]
     search_fields = ["issue", "customer__full_name", "customer__phone"]
     ordering_fields = ["created_at", "priority"]
-    ordering = ["-created_at"]
+    ordering = ["-created_at", "id"]
+    pagination_class = OptionalCursorPagination
+    export_spec = COMPLAINT_EXPORT
 
     @action(detail=True, methods=["post"])
     def resolve(self, request, pk=None):
@@ -29,33 +45,3 @@ class ComplaintViewSet(viewsets.ModelViewSet):
         complaint.status = "resolved"
         complaint.save()
         return Response({"message": "Complaint resolved successfully"}, status=status.HTTP_200_OK)
-
-    @action(detail=False, methods=["get"])
-    def export_excel(self, request):
-        queryset = self.filter_queryset(self.get_queryset())
-
-        wb = Workbook()
-        ws = wb.active
-        ws.title = "Complaints"
-
-        # العناوين
-        ws.append(["ID", "Customer", "Phone", "Issue", "Priority", "Status", "Date", "Order"])
-
-        for complaint in queryset:
-            ws.append([
-                complaint.id,
-                complaint.customer.full_name if complaint.customer else "",
-                complaint.customer.phone if complaint.customer else "",
-                complaint.issue,
-                complaint.priority,
-                complaint.status,
-                complaint.created_at.strftime("%Y-%m-%d %H:%M"),
-                complaint.order.id if complaint.order else "",
-            ])
-
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        response["Content-Disposition"] = 'attachment; filename="complaints.xlsx"'
-        wb.save(response)
-        return response
@@ -1,7 +1,8 @@
+from django.conf import settings
 from django.utils import timezone
-from django.db.models import Count, Sum, Avg
 from django.http import HttpResponse
-from rest_framework import viewsets
+from django.utils.dateparse import parse_date
+from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
@@ -9,7 +10,9 @@ from openpyxl import Workbook
 from datetime import timedelta
 
 from api.permissions import IsAdminOrManager
-from api.models import Customer, Complaint, Order, FinalInvoice
+from api.models import Order, FinalInvoice
+from api.metrics import dashboard_metrics, chart_series
+from api.analytics import GROUP_BY_CHOICES, LATE_AFTER_MINUTES, PERIODS, delivery_performance
 
 
 class DashboardViewSet(viewsets.ViewSet):
@@ -17,60 +20,94 @@ class DashboardViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["get"])
     def summary(self, request):
-        today = timezone.now().date()
-
-        total_orders = Order.objects.count()
-        pending_orders = Order.objects.filter(status="pending").count()
-        total_revenue = FinalInvoice.objects.aggregate(total=Sum("total"))["total"] or 0
-        active_customers = Customer.objects.count()
-
-        today_orders = Order.objects.filter(created_at__date=today).count()
-        today_revenue = FinalInvoice.objects.filter(finalized_at__date=today).aggregate(total=Sum("total"))["total"] or 0
-        avg_order_value = FinalInvoice.objects.aggregate(avg=Avg("total"))["avg"] or 0
+        metrics = dashboard_metrics()
+        total_orders = metrics["orders_total"]
+        active_customers = metrics["customers_total"]
         conversion_rate = round(total_orders / active_customers, 2) if active_customers > 0 else 0
 
         return Response({
             "orders_count": total_orders,
-            "orders_pending": pending_orders,
-            "invoices_total": total_revenue,
+            "orders_pending": metrics["orders_pending"],
+            "invoices_total": metrics["revenue_total"],
             "new_customers": active_customers,
-            "today_orders": today_orders,
-            "today_revenue": today_revenue,
-            "avg_order_value": avg_order_value,
+            "today_orders": metrics["orders_today"],
+            "today_revenue": metrics["revenue_today"],
+            "avg_order_value": metrics["invoice_avg_value"],
             "conversion_rate": conversion_rate,
         })
 
     @action(detail=False, methods=["get"])
     def chart(self, request):
         period = request.query_params.get("period", "7d")
-        today = timezone.now().date()
-
-        if period == "30d":
-            start_date = today - timedelta(days=30)
-        elif period == "90d":
-            start_date = today - timedelta(days=90)
+        granularity = request.query_params.get("granularity", "day")
+        today = timezone.localdate()
+
+        if granularity not in ("day", "week", "month"):
+            return Response({"detail": "granularity must be day, week or month."}, status=status.HTTP_400_BAD_REQUEST)
+
+        start = request.query_params.get("start")
+        end = request.query_params.get("end")
+        if start or end:
+            try:
+                start_date = parse_date(start) if start else today - timedelta(days=7)
+                end_date = parse_date(end) if end else today
+            except ValueError:
+                start_date = end_date = None
+            if not start_date or not end_date or start_date > end_date:
+                return Response({"detail": "start and end must be valid dates (YYYY-MM-DD), start <= end."}, status=status.HTTP_400_BAD_REQUEST)
         else:
-            start_date = today - timedelta(days=7)
-
-        orders = (
-            Order.objects.filter(created_at__date__gte=start_date)
-            .extra(select={"day": "date(created_at)"})
-            .values("day")
-            .annotate(count=Count("id"))
-            .order_by("day")
-        )
+            end_date = today
+            if period == "30d":
+                start_date = today - timedelta(days=30)
+            elif period == "90d":
+                start_date = today - timedelta(days=90)
+            else:
+                start_date = today - timedelta(days=7)
+
+        if (end_date - start_date).days >= settings.DASHBOARD_CHART_MAX_DAYS:
+            return Response(
+                {"detail": f"The chart covers at most {settings.DASHBOARD_CHART_MAX_DAYS} days."},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+
+        series = chart_series(start_date, end_date, granularity)
 
-        revenue = (
-            FinalInvoice.objects.filter(finalized_at__date__gte=start_date)
-            .extra(select={"day": "date(finalized_at)"})
-            .values("day")
-            .annotate(total=Sum("total"))
-            .order_by("day")
-        )
+        return Response({
+            "orders": [{"day": row["day"], "count": row["orders_total"]} for row in series],
+            "revenue": [{"day": row["day"], "total": row["revenue"]} for row in series],
+            "series": series,
+        })
+
+    @action(detail=False, methods=["get"])
+    def delivery_performance(self, request):
+        """Delivery analytics for orders due between ``start`` and ``end``
+        (default: the last 30 days), grouped by ``group_by`` (driver, area,
+        zone or period). Periods are a day, week or month (``granularity``)."""
+        group_by = request.query_params.get("group_by", "driver")
+        granularity = request.query_params.get("granularity", "day")
+        if group_by not in GROUP_BY_CHOICES:
+            return Response({"detail": "group_by must be driver, area, zone or period."}, status=status.HTTP_400_BAD_REQUEST)
+        if granularity not in PERIODS:
+            return Response({"detail": "granularity must be day, week or month."}, status=status.HTTP_400_BAD_REQUEST)
+
+        today = timezone.localdate()
+        start = request.query_params.get("start")
+        end = request.query_params.get("end")
+        try:
+            start_date = parse_date(start) if start else today - timedelta(days=30)
+            end_date = parse_date(end) if end else today
+        except ValueError:
+            start_date = end_date = None
+        if not start_date or not end_date or start_date > end_date:
+            return Response({"detail": "start and end must be valid dates (YYYY-MM-DD), start <= end."}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
-            "orders": list(orders),
-            "revenue": list(revenue),
+            "start": start_date,
+            "end": end_date,
+            "group_by": group_by,
+            "granularity": granularity,
+            "late_after_minutes": LATE_AFTER_MINUTES,
+            "rows": delivery_performance(start_date, end_date, group_by, granularity),
         })
 
     @action(detail=False, methods=["get"])
@@ -105,36 +142,27 @@ class DashboardViewSet(viewsets.ViewSet):
 
     @action(detail=False, methods=["get"])
     def alerts(self, request):
-        pending_orders = Order.objects.filter(status="pending").count()
-        overdue_invoices = FinalInvoice.objects.filter(
-            finalized_at__lt=timezone.now() - timedelta(days=30)
-        ).count()
-        new_complaints = Complaint.objects.filter(status="new").count()
-
+        metrics = dashboard_metrics()
         return Response({
-            "pending_orders": pending_orders,
-            "overdue_invoices": overdue_invoices,
-            "new_complaints": new_complaints,
+            "pending_orders": metrics["orders_pending"],
+            "overdue_invoices": metrics["invoices_overdue"],
+            "new_complaints": metrics["complaints_new"],
         })
 
     @action(detail=False, methods=["get"])
     def export_excel(self, request):
-        today = timezone.now().date()
-
-        total_orders = Order.objects.count()
-        pending_orders = Order.objects.filter(status="pending").count()
-        total_revenue = FinalInvoice.objects.aggregate(total=Sum("total"))["total"] or 0
-        active_customers = Customer.objects.count()
+        today = timezone.localdate()
+        metrics = dashboard_metrics()
 
         wb = Workbook()
         ws = wb.active
         ws.title = "Dashboard Summary"
 
         ws.append(["Metric", "Value"])
-        ws.append(["Total Orders", total_orders])
-        ws.append(["Pending Orders", pending_orders])
-        ws.append(["Total Revenue", total_revenue])
-        ws.append(["Active Customers", active_customers])
+        ws.append(["Total Orders", metrics["orders_total"]])
+        ws.append(["Pending Orders", metrics["orders_pending"]])
+        ws.append(["Total Revenue", metrics["revenue_total"]])
+        ws.append(["Active Customers", metrics["customers_total"]])
         ws.append(["Generated At", str(today)])
 
         response = HttpResponse(
@@ -0,0 +1,48 @@
+from django.db import transaction
+from django.http import FileResponse
+from rest_framework import viewsets, mixins, status
+from rest_framework.decorators import action
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from api.models import ExportJob
+from api.serializers import ExportJobSerializer
+from api.export_jobs import build_view, params_hash, reusable_job
+from api.tasks import run_export_job
+
+
+class ExportJobViewSet(mixins.CreateModelMixin,
+                       mixins.RetrieveModelMixin,
+                       mixins.ListModelMixin,
+                       viewsets.GenericViewSet):
+    serializer_class = ExportJobSerializer
+    permission_classes = [IsAuthenticated]
+    queryset = ExportJob.objects.none()
+
+    def get_queryset(self):
+        return ExportJob.objects.filter(created_by=self.request.user)
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        kind = serializer.validated_data["kind"]
+        params = serializer.validated_data.get("params", {})
+
+        # The export runs with the same permissions as the endpoint it replaces.
+        view = build_view(kind, request.user, params, request=request)
+        view.check_permissions(request)
+
+        job = reusable_job(request.user, kind, params)
+        if job:
+            return Response(self.get_serializer(job).data, status=status.HTTP_200_OK)
+
+        job = serializer.save(created_by=request.user, params_hash=params_hash(kind, params))
+        transaction.on_commit(lambda: run_export_job.delay(str(job.pk)))
+        return Response(self.get_serializer(job).data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=["get"])
+    def download(self, request, pk=None):
+        job = self.get_object()
+        if job.status != "done" or not job.file:
+            return Response({"detail": "Export is not ready."}, status=status.HTTP_409_CONFLICT)
+        return FileResponse(job.file.open("rb"), as_attachment=True, filename=job.file.name.rsplit("/", 1)[-1])
@@ -2,28 +2,83 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
-from io import BytesIO
+from django.db import IntegrityError
+from django.http import FileResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+from decimal import Decimal
+import tempfile
 import openpyxl
-from reportlab.pdfgen import canvas
-from reportlab.lib.pagesizes import A4
 
-from api.models import RecheckInvoice, FinalInvoice, User
-from api.serializers import RecheckInvoiceSerializer, FinalInvoiceSerializer
+from api.models import RecheckInvoice, FinalInvoice, CustomerLedger, User
+from api.serializers import RecheckInvoiceSerializer, FinalInvoiceSerializer, CustomerLedgerSerializer, BulkFinalizeSerializer, BulkFinalizeResponseSerializer, InvoicePdfBatchSerializer
+from api.billing import finalize_rechecks
+from api.artifacts import artifact_key, open_artifact
+from api.invoice_pdf import TEMPLATE_VERSION, invoice_context, invoice_contexts, render_document, render_zip
+from api.exports import ExcelExportMixin, ExportSpec, Column
 from api.permissions import IsAdminOrManager, IsAccountant
+from api.search import IndexedSearchFilter
+from api.pagination import OptionalCursorPagination
 from rest_framework.permissions import IsAuthenticated
 
 
-class AdminRecheckViewSet(viewsets.ModelViewSet):
-    queryset = RecheckInvoice.objects.all().order_by("-period_start")
+RECHECK_EXPORT = ExportSpec("recheck_invoices.xlsx", "Recheck Invoices", [
+    Column("Customer", "customer__full_name"),
+    Column("Phone", "customer__phone"),
+    Column("Period Start", "period_start", lambda day: day.strftime("%d/%m/%Y")),
+    Column("Period End", "period_end", lambda day: day.strftime("%d/%m/%Y")),
+    Column("Total Trips", "total_trips"),
+    Column("Total Gallons", "total_gallons"),
+    Column("Status", "status"),
+])
+
+
+# Bump when the layout changes so cached invoice workbooks are rendered again.
+XLSX_TEMPLATE_VERSION = 1
+
+
+def render_invoice_xlsx(invoice, fileobj):
+    wb = openpyxl.Workbook()
+    ws = wb.active
+    ws.title = f"Invoice_{invoice['customer_name']}"
+
+    # Header
+    ws.append(["Customer", invoice["customer_name"]])
+    ws.append(["Phone", invoice["phone"]])
+    ws.append(["Area", invoice["area"] or ""])
+    ws.append(["Account Number", invoice["account_number"] or ""])
+    ws.append([])
+    ws.append(["Period Start", invoice["period_start"].strftime("%d/%m/%Y")])
+    ws.append(["Period End", invoice["period_end"].strftime("%d/%m/%Y")])
+    ws.append(["Total Trips", invoice["total_trips"]])
+    ws.append(["Total Gallons", invoice["total_gallons"]])
+    ws.append(["Price per Gallon", float(invoice["price_per_gallon"])])
+    ws.append(["Subtotal", float(invoice["subtotal"])])
+    ws.append(["VAT %", float(invoice["vat_percent"])])
+    ws.append(["VAT Amount", float(invoice["vat_amount"])])
+    ws.append(["Total", float(invoice["total"])])
+    if invoice["notes"]:
+        ws.append([])
+        ws.append(["Notes", invoice["notes"]])
+    wb.save(fileobj)
+
+
+class AdminRecheckViewSet(ExcelExportMixin, viewsets.ModelViewSet):
+    queryset = RecheckInvoice.objects.order_by("-period_start")
     serializer_class = RecheckInvoiceSerializer
     permission_classes = [IsAuthenticated, IsAdminOrManager]
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     search_fields = ["customer__full_name", "customer__phone", "customer__driver__username"]
     filterset_fields = ["status", "assigned_to"]
     ordering_fields = ["period_start", "total_gallons", "total_trips"]
+    ordering = ["-period_start", "id"]
+    pagination_class = OptionalCursorPagination
+    export_spec = RECHECK_EXPORT
 
+    def get_queryset(self):
+        related = self.get_serializer_class().select_related_for(self.request)
+        return self.queryset.select_related(*related)
 
     @action(detail=True, methods=["post"])
     def send_to_accountant(self, request, pk=None):
@@ -44,46 +99,20 @@ class AdminRecheckViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(recheck)
         return Response(serializer.data)
 
-    @action(detail=False, methods=["get"])
-    def export_excel(self, request):
-        qs = self.filter_queryset(self.get_queryset())
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = "Recheck Invoices"
-        headers = ["Customer", "Phone", "Period Start", "Period End", "Total Trips", "Total Gallons", "Status"]
-        ws.append(headers)
-
-        for r in qs:
-            ws.append([
-                r.customer.full_name,
-                r.customer.phone,
-                r.period_start.strftime("%d/%m/%Y"),
-                r.period_end.strftime("%d/%m/%Y"),
-                r.total_trips,
-                r.total_gallons,
-                r.status
-            ])
-
-        out = BytesIO()
-        wb.save(out)
-        out.seek(0)
-        response = HttpResponse(out.read(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        response["Content-Disposition"] = 'attachment; filename="recheck_invoices.xlsx"'
-        return response
-
 
 class AccountantInvoiceViewSet(viewsets.ModelViewSet):
-    queryset = FinalInvoice.objects.select_related("recheck__customer").all().order_by("-finalized_at")
+    queryset = FinalInvoice.objects.order_by("-finalized_at")
     serializer_class = FinalInvoiceSerializer
     permission_classes = [IsAuthenticated, IsAccountant]
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     search_fields = ["recheck__customer__full_name", "recheck__customer__phone", "recheck__customer__driver__username"]
     filterset_fields = ["recheck__period_start"]
     ordering_fields = ["finalized_at", "total"]
 
     def get_queryset(self):
-        return self.queryset.filter(recheck__assigned_to=self.request.user)
+        related = self.get_serializer_class().select_related_for(self.request)
+        return self.queryset.filter(recheck__assigned_to=self.request.user).select_related(*related)
 
     def create(self, request, *args, **kwargs):
         recheck_id = request.data.get("recheck")
@@ -107,102 +136,110 @@ class AccountantInvoiceViewSet(viewsets.ModelViewSet):
         serializer = self.get_serializer(final)
         return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-    @action(detail=True, methods=["get"])
-    def export_excel(self, request, pk=None):
+    @action(detail=False, methods=["post"])
+    def bulk_finalize(self, request):
+        """Issue final invoices for many sent rechecks at once. Prices come
+        from ``recheck_prices`` (by recheck id), then ``group_prices`` (by the
+        customer's ``group_by`` field), then ``price_per_gallon``. Without
+        ``rechecks`` every sent recheck still waiting for an invoice is used."""
+        serializer = BulkFinalizeSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        try:
+            results = finalize_rechecks(request.user, serializer.validated_data)
+        except IntegrityError:
+            return Response(
+                {"detail": "Some of these rechecks were finalized meanwhile, retry."},
+                status=status.HTTP_409_CONFLICT,
+            )
+        created = [result for result in results if result["ok"]]
+        return Response(BulkFinalizeResponseSerializer({
+            "created": len(created),
+            "failed": len(results) - len(created),
+            "total": sum((result["total"] for result in created), Decimal("0.00")),
+            "results": results,
+        }).data, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK)
+
+    def artifact_response(self, request, kind, version, render, content_type, as_attachment):
+        """Serve a rendered document for the invoice from the artifact cache,
+        keyed on every field it is rendered from."""
         final = self.get_object()
-        recheck = final.recheck
-        customer = recheck.customer
-
-        wb = openpyxl.Workbook()
-        ws = wb.active
-        ws.title = f"Invoice_{customer.full_name}"
-
-        # Header
-        ws.append(["Customer", customer.full_name])
-        ws.append(["Phone", customer.phone])
-        ws.append(["Area", customer.area or ""])
-        ws.append(["Account Number", customer.account_number or ""])
-        ws.append([])
-        ws.append(["Period Start", recheck.period_start.strftime("%d/%m/%Y")])
-        ws.append(["Period End", recheck.period_end.strftime("%d/%m/%Y")])
-        ws.append(["Total Trips", recheck.total_trips])
-        ws.append(["Total Gallons", recheck.total_gallons])
-        ws.append(["Price per Gallon", float(final.price_per_gallon)])
-        ws.append(["Subtotal", float(final.subtotal)])
-        ws.append(["VAT %", float(final.vat_percent)])
-        ws.append(["VAT Amount", float(final.vat_amount)])
-        ws.append(["Total", float(final.total)])
-        if final.notes:
-            ws.append([])
-            ws.append(["Notes", final.notes])
-
-        out = BytesIO()
-        wb.save(out)
-        out.seek(0)
-        response = HttpResponse(out.read(), content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet")
-        response["Content-Disposition"] = f'attachment; filename="invoice_{final.id}.xlsx"'
+        invoice = invoice_context(final)
+        key = artifact_key(kind, version, invoice)
+        etag = quote_etag(key)
+        not_modified = get_conditional_response(request._request, etag=etag)
+        if not_modified is not None:
+            return not_modified
+
+        response = FileResponse(
+            open_artifact(kind, final.id, key, lambda fileobj: render(invoice, fileobj)),
+            as_attachment=as_attachment,
+            filename=f"invoice_{final.id}.{kind}",
+            content_type=content_type,
+        )
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
         return response
 
+    @action(detail=True, methods=["get"])
+    def export_excel(self, request, pk=None):
+        return self.artifact_response(
+            request, "xlsx", XLSX_TEMPLATE_VERSION, render_invoice_xlsx,
+            "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet", as_attachment=True,
+        )
+
+    @action(detail=False, methods=["post"])
+    def export_pdf_batch(self, request):
+        """Render many invoices (``ids``) as one merged PDF or, with
+        ``format=zip``, a ZIP of one PDF per invoice."""
+        serializer = InvoicePdfBatchSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data["ids"]
+        output_format = serializer.validated_data["format"]
+
+        invoices = {invoice["id"]: invoice for invoice in invoice_contexts(self.get_queryset().filter(pk__in=ids))}
+        missing = [pk for pk in ids if pk not in invoices]
+        if missing:
+            return Response({"detail": "Invoices not found.", "missing": missing}, status=status.HTTP_404_NOT_FOUND)
+        invoices = [invoices[pk] for pk in ids]
+
+        output = tempfile.TemporaryFile()
+        if output_format == "zip":
+            render_zip(invoices, output)
+        else:
+            render_document(invoices, output)
+        output.seek(0)
+        return FileResponse(
+            output,
+            as_attachment=True,
+            filename=f"invoices.{output_format}",
+            content_type="application/zip" if output_format == "zip" else "application/pdf",
+        )
+
     @action(detail=True, methods=["get"])
     def export_pdf(self, request, pk=None):
-        final = self.get_object()
-        recheck = final.recheck
-        customer = recheck.customer
-
-        p = canvas.Canvas(buffer, pagesize=A4)
-        buffer = BytesIO()
-        width, height = A4
-        y = height - 50
-
-        p.setFont("Helvetica-Bold", 14)
-		# Header
-        p.drawString(50, y, f"Invoice #{final.id}")
-        y -= 25
-        p.setFont("Helvetica", 10)
-        p.drawString(50, y, f"Customer: {customer.full_name}")
-        y -= 15
-        p.drawString(50, y, f"Phone: {customer.phone or ''}")
-        y -= 15
-        p.drawString(50, y, f"Area: {customer.area or ''}")
-        y -= 25
-
-        # Table-like lines
-        p.setFont("Helvetica-Bold", 10)
-        p.drawString(50, y, "Period")
-        p.drawString(150, y, "Trips")
-        p.drawString(230, y, "Gallons")
-        p.drawString(330, y, "Price/gal")
-        p.drawString(430, y, "Line Total")
-        y -= 15
-        p.setFont("Helvetica", 10)
-
-        line_total = final.subtotal
-        period_str = f"{recheck.period_start.strftime('%d/%m/%Y')} → {recheck.period_end.strftime('%d/%m/%Y')}"
-        p.drawString(50, y, period_str)
-        p.drawString(150, y, str(recheck.total_trips))
-        p.drawString(230, y, str(recheck.total_gallons))
-        p.drawString(330, y, f"{final.price_per_gallon:.2f}")
-        p.drawString(430, y, f"{line_total:.2f}")
-        y -= 30
-
-		# Summary
-        p.drawString(330, y, "Subtotal:")
-        p.drawString(430, y, f"{final.subtotal:.2f}")
-        y -= 15
-        p.drawString(330, y, f"VAT ({final.vat_percent}%):")
-        p.drawString(430, y, f"{final.vat_amount:.2f}")
-        y -= 15
-        p.setFont("Helvetica-Bold", 11)
-        p.drawString(330, y, "TOTAL:")
-        p.drawString(430, y, f"{final.total:.2f}")
-        y -= 30
-
-        if final.notes:
-             p.setFont("Helvetica", 9)
-             p.drawString(50, y, f"Notes: {final.notes}")
-             y -= 15
-
-        p.showPage()
-        p.save()
-        buffer.seek(0)
-        return HttpResponse(buffer.read(), content_type="application/pdf")
\ No newline at end of file
+        return self.artifact_response(
+            request, "pdf", TEMPLATE_VERSION, lambda invoice, fileobj: render_document([invoice], fileobj),
+            "application/pdf", as_attachment=False,
+        )
+
+
+class CustomerLedgerViewSet(viewsets.ReadOnlyModelViewSet):
+    """Per-customer totals over rechecks and final invoices, kept current on
+    every invoice write."""
+    queryset = CustomerLedger.objects.select_related("customer")
+    serializer_class = CustomerLedgerSerializer
+    permission_classes = [IsAuthenticated, IsAdminOrManager | IsAccountant]
+
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
+    search_fields = ["customer__full_name", "customer__phone"]
+    filterset_fields = {
+        "customer__area": ["exact"],
+        "customer__zone_number": ["exact"],
+        "customer__property_type": ["exact"],
+        "invoiced": ["gte", "lte"],
+        "invoice_count": ["gte", "lte"],
+        "last_invoice_at": ["gte", "lte", "isnull"],
+    }
+    ordering_fields = ["invoiced", "invoice_count", "period_count", "gallons", "last_invoice_at", "customer__full_name"]
+    ordering = ["-invoiced", "customer"]
+    pagination_class = OptionalCursorPagination
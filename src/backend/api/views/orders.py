@@ -1,75 +1,91 @@
 # views.py
+import hashlib
+import json
+import logging
+import uuid
+from datetime import datetime, timedelta, timezone as dt_timezone
 from rest_framework import viewsets, filters
 from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
 from django_filters.rest_framework import DjangoFilterBackend
-from django.http import HttpResponse
-import openpyxl
-from openpyxl.utils import get_column_letter
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.core.files.storage import default_storage
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.dateparse import parse_date
+from django.utils.http import http_date, quote_etag
 
-from api.models import Order
-from api.serializers import OrderSerializer, DriverOrderSerializer
+from api.exports import ExcelExportMixin, ExportSpec, Column, format_datetime, or_dash
+from api.models import Order, DriverActionReceipt, confirmation_is_late
+from api.serializers import OrderSerializer, OrderListSerializer, DriverOrderSerializer, DriverManifestSerializer, DriverBatchSerializer
 from api.permissions import IsAdminOrManager, IsDriver
+from api.search import IndexedSearchFilter
+from api.pagination import OptionalCursorPagination
+from api.uploads import open_upload, discard_upload
+from api.batch import apply_driver_batch
 
-class OrderViewSet(viewsets.ModelViewSet):
+
+logger = logging.getLogger(__name__)
+
+
+ORDER_EXPORT = ExportSpec("orders.xlsx", "Orders", [
+    Column("ID", "id"),
+    Column("Customer", "customer__full_name", or_dash),
+    Column("Driver", "driver__username", or_dash),
+    Column("Status", "status"),
+    Column("Created At", "created_at", format_datetime),
+    Column("Confirmed At", "confirmed_at", format_datetime),
+    Column("Filled Amount", "filled_amount"),
+    Column(
+        "Is Late", ("confirmed_at", "delivery_time", "created_at"),
+        lambda confirmed_at, delivery_time, created_at: confirmation_is_late(confirmed_at, delivery_time, created_at, minutes=30),
+    ),
+    Column("Problem Reason", "problem_reason"),
+    Column(
+        "Proof Image", ("proof_thumbnail", "proof_image"),
+        lambda thumbnail, name: default_storage.url(thumbnail or name) if thumbnail or name else "-",
+    ),
+])
+
+
+class OrderViewSet(ExcelExportMixin, viewsets.ModelViewSet):
     queryset = Order.objects.all()
     serializer_class = OrderSerializer
     permission_classes = [IsAuthenticated, IsAdminOrManager]
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     filterset_fields = ["status", "customer__full_name", "driver__username"]
     search_fields = ["customer__full_name", "driver__username"]
     ordering_fields = ["created_at", "confirmed_at", "status"]
     ordering = ["-created_at", "id"]
-    
-    @action(detail=False, methods=["get"])
-    def export_excel(self, request):
-        queryset = self.filter_queryset(self.get_queryset())
-
-        workbook = openpyxl.Workbook()
-        sheet = workbook.active
-        sheet.title = "Orders"
-
-        headers = [
-            "ID", "Customer", "Driver", "Status",
-            "Created At", "Confirmed At", "Filled Amount",
-            "Is Late", "Problem Reason", "Proof Image"
-        ]
-        sheet.append(headers)
-
-        for order in queryset:
-            sheet.append([
-                order.id,
-                order.customer.full_name if order.customer else "-",
-                order.driver.username if order.driver else "-",
-                order.status,
-                order.created_at.strftime("%Y-%m-%d %H:%M") if order.created_at else "",
-                order.confirmed_at.strftime("%Y-%m-%d %H:%M") if order.confirmed_at else "",
-                getattr(order, "filled_amount", "-"),
-                order.is_driver_late(minutes=30),
-                getattr(order, "problem_reason", "-"),
-                order.proof_image.url if order.proof_image else "-",
-            ])
-
-        for col in sheet.columns:
-            max_length = 0
-            col_letter = get_column_letter(col[0].column)
-            for cell in col:
-                try:
-                    if cell.value:
-                        max_length = max(max_length, len(str(cell.value)))
-                except:
-                    pass
-            adjusted_width = (max_length + 2)
-            sheet.column_dimensions[col_letter].width = adjusted_width
-
-        response = HttpResponse(
-            content_type="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-        )
-        response["Content-Disposition"] = 'attachment; filename="orders.xlsx"'
-        workbook.save(response)
-        return response
+    pagination_class = OptionalCursorPagination
+    export_spec = ORDER_EXPORT
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return OrderListSerializer
+        return OrderSerializer
+
+    def get_queryset(self):
+        related = self.get_serializer_class().select_related_for(self.request)
+        return Order.objects.select_related(*related)
+
+    def perform_create(self, serializer):
+        self.save_unique_per_day(serializer)
+
+    def perform_update(self, serializer):
+        self.save_unique_per_day(serializer)
+
+    def save_unique_per_day(self, serializer):
+        try:
+            with transaction.atomic():
+                serializer.save()
+        except IntegrityError:
+            raise ValidationError({"detail": "This customer already has an order on that day."})
 
 
 # from openpyxl.drawing.image import Image as ExcelImage
@@ -118,19 +134,102 @@ class OrderViewSet(viewsets.ModelViewSet):
 #     return response
 
 
+def parse_upload_id(value):
+    try:
+        return uuid.UUID(str(value))
+    except ValueError:
+        return None
+
+
+def sync_token(moment):
+    return str(int(moment.timestamp() * 1_000_000))
+
+
+def parse_sync_token(token):
+    return datetime.fromtimestamp(int(token) / 1_000_000, tz=dt_timezone.utc)
+
+
 class DriverOrderViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = DriverOrderSerializer
     permission_classes = [IsAuthenticated, IsDriver]
     queryset = Order.objects.none()
 
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
+    filter_backends = [DjangoFilterBackend, IndexedSearchFilter, filters.OrderingFilter]
     filterset_fields = ["status"]
     search_fields = ["customer__full_name"]
     ordering_fields = ["created_at", "confirmed_at"]
-    ordering = ["-created_at"]
+    ordering = ["-created_at", "id"]
+    pagination_class = OptionalCursorPagination
 
     def get_queryset(self):
-        return Order.objects.filter(driver=self.request.user)
+        related = self.get_serializer_class().select_related_for(self.request)
+        return Order.objects.filter(driver=self.request.user).select_related(*related)
+
+    @action(detail=False, methods=["get"])
+    def manifest(self, request):
+        """The driver's orders for one day (``?date=``, default today) in
+        delivery order. With ``?since=<token>`` only orders changed after that
+        sync are returned, plus the ids still on the manifest so clients can
+        drop removed ones."""
+        try:
+            day = parse_date(request.query_params.get("date", "")) or timezone.localdate()
+            since = request.query_params.get("since")
+            since = parse_sync_token(since) if since else None
+        except (ValueError, OverflowError):
+            return Response({"error": "Invalid date or since token"}, status=400)
+
+        orders = Order.objects.filter(driver=request.user, delivery_date=day)
+        versions = list(orders.values_list("id", "updated_at"))
+        newest = max((updated_at for _, updated_at in versions), default=since)
+        data = {"date": day, "token": sync_token(newest) if newest else None}
+
+        manifest = orders.select_related("customer").order_by("delivery_time", "id")
+        if since:
+            overlap = timedelta(seconds=settings.DRIVER_MANIFEST_SYNC_OVERLAP)
+            manifest = manifest.filter(updated_at__gte=since - overlap)
+            data["ids"] = sorted(order_id for order_id, _ in versions)
+        data["orders"] = DriverManifestSerializer(manifest, many=True).data
+
+        etag = quote_etag(hashlib.sha256(JSONRenderer().render(data)).hexdigest())
+        last_modified = newest.timestamp() if newest else None
+        not_modified = get_conditional_response(request._request, etag=etag, last_modified=last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = Response(data)
+        response["ETag"] = etag
+        response["Cache-Control"] = "private, no-cache"
+        if last_modified:
+            response["Last-Modified"] = http_date(last_modified)
+        return response
+
+    @action(detail=False, methods=["post"])
+    def batch(self, request):
+        """Replay queued confirmations and problem reports in one call. Each
+        item carries a client ``key``; resending a key returns its first
+        result. Proofs are ``upload_id``s or multipart files named
+        ``proof_image.<key>`` (with ``items`` then sent as a JSON string)."""
+        items = request.data.get("items")
+        if isinstance(items, str):
+            try:
+                items = json.loads(items)
+            except ValueError:
+                return Response({"error": "items must be a JSON array"}, status=400)
+        serializer = DriverBatchSerializer(data={"items": items})
+        serializer.is_valid(raise_exception=True)
+
+        items = serializer.validated_data["items"]
+        try:
+            results = apply_driver_batch(request.user, items, request.FILES)
+        except IntegrityError:
+            # Receipts for these keys committed under us: another request
+            # applied them, and a retry replays its results. Any other
+            # conflict would fail the same way again.
+            if DriverActionReceipt.objects.filter(driver=request.user, key__in=[item["key"] for item in items]).exists():
+                return Response({"error": "Batch is already being applied, retry shortly"}, status=409)
+            logger.exception("driver %s batch conflicts with stored data", request.user.pk)
+            return Response({"error": "Batch conflicts with stored data and was not applied"}, status=400)
+        return Response({"results": results}, status=200)
 
     @action(detail=True, methods=["post"])
     def confirm(self, request, pk=None):
@@ -142,11 +241,27 @@ class DriverOrderViewSet(viewsets.ReadOnlyModelViewSet):
 
         filled_amount = request.data.get("filled_amount")
         proof_image = request.FILES.get("proof_image")
+        upload = None
+        upload_id = request.data.get("upload_id")
+        if upload_id and not proof_image:
+            upload = order.upload_sessions.filter(
+                pk=parse_upload_id(upload_id), driver=request.user, status="complete"
+            ).first()
+            if upload is None:
+                return Response({"error": "Upload not found or not complete"}, status=400)
+            proof_image = open_upload(upload)
 
         if not filled_amount or not proof_image:
             return Response({"error": "Both filled amount and proof image are required"}, status=400)
 
-        order.confirm(filled_amount=filled_amount, proof_image=proof_image)
+        if upload is None:
+            order.confirm(filled_amount=filled_amount, proof_image=proof_image)
+        else:
+            with proof_image:
+                order.confirm(filled_amount=filled_amount, proof_image=proof_image)
+            upload.status = "used"
+            upload.save(update_fields=["status", "updated_at"])
+            discard_upload(upload)
         serializer = self.get_serializer(order)
         return Response({
             "message": "Order confirmed successfully",
@@ -0,0 +1,71 @@
+from io import BytesIO
+from django.db import transaction
+from rest_framework import viewsets, mixins, status
+from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import IsAuthenticated
+from rest_framework.response import Response
+
+from api.models import UploadSession
+from api.permissions import IsDriver
+from api.serializers import UploadSessionSerializer
+from api.uploads import spool_chunk, upload_offset, write_chunk
+
+
+class UploadSessionViewSet(mixins.CreateModelMixin,
+                           mixins.RetrieveModelMixin,
+                           viewsets.GenericViewSet):
+    """Resumable proof uploads: create a session, PATCH the raw bytes in
+    chunks with an ``Upload-Offset`` header, then confirm the order with the
+    session id. GET returns the offset to resume from."""
+    serializer_class = UploadSessionSerializer
+    permission_classes = [IsAuthenticated, IsDriver]
+    queryset = UploadSession.objects.none()
+
+    def get_queryset(self):
+        return UploadSession.objects.filter(driver=self.request.user)
+
+    def perform_create(self, serializer):
+        serializer.save(driver=self.request.user)
+
+    def check_offset(self, session, offset):
+        if session.status != "open":
+            return Response({"error": "Upload already complete"}, status=status.HTTP_409_CONFLICT)
+        if offset != session.offset:
+            return Response(
+                {"error": "Offset does not match the upload", "offset": session.offset},
+                status=status.HTTP_409_CONFLICT,
+                headers={"Upload-Offset": str(session.offset)},
+            )
+        return None
+
+    def partial_update(self, request, pk=None):
+        offset = upload_offset(request)
+        if offset is None:
+            return Response({"error": "Upload-Offset header is required"}, status=400)
+
+        # The body is read straight from the request stream, never parsed,
+        # and spooled before the session row is locked so a slow client
+        # doesn't hold the lock; the offset is checked again under it.
+        session = get_object_or_404(self.get_queryset(), pk=pk)
+        rejected = self.check_offset(session, offset)
+        if rejected:
+            return rejected
+        try:
+            chunk = spool_chunk(request.stream or BytesIO(), session.size - offset)
+        except ValueError as exc:
+            return Response({"error": str(exc), "offset": session.offset}, status=400)
+
+        with chunk, transaction.atomic():
+            session = get_object_or_404(self.get_queryset().select_for_update(), pk=pk)
+            rejected = self.check_offset(session, offset)
+            if rejected:
+                return rejected
+            session.offset += write_chunk(session.path, chunk, offset)
+            if session.offset == session.size:
+                session.status = "complete"
+            session.save(update_fields=["offset", "status", "updated_at"])
+
+        return Response(
+            {"offset": session.offset, "size": session.size, "status": session.status},
+            headers={"Upload-Offset": str(session.offset)},
+        )
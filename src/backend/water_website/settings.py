@@ -58,6 +58,22 @@ CHANNEL_LAYERS = {
     },
 }
 
+# ======================
+# Cache
+# ======================
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": "redis://water_redis:6379/1",
+    }
+}
+
+# Dashboard counters are cached this many seconds; writes invalidate them.
+DASHBOARD_CACHE_TTL = int(os.getenv("DASHBOARD_CACHE_TTL", "30"))
+# Longest range the dashboard chart serves. Past days it finds without a
+# rollup are rolled up on read, so this also bounds that work.
+DASHBOARD_CHART_MAX_DAYS = int(os.getenv("DASHBOARD_CHART_MAX_DAYS", "366"))
+
 # ======================
 # Django REST Framework
 # ======================
@@ -168,6 +184,46 @@ STATIC_ROOT = os.path.join(BASE_DIR, "staticfiles")
 MEDIA_URL = "/media/"
 MEDIA_ROOT = os.path.join(BASE_DIR, "media")
 
+# Proof photos are re-encoded in the background after upload.
+PROOF_IMAGE_FORMAT = "WEBP"
+PROOF_IMAGE_QUALITY = 80
+PROOF_IMAGE_MAX_SIZE = 1600
+PROOF_THUMBNAIL_SIZE = 320
+
+# Resumable proof uploads are assembled here, outside MEDIA_ROOT, until the
+# order is confirmed with them.
+UPLOAD_SESSION_ROOT = os.path.join(BASE_DIR, "uploads")
+UPLOAD_SESSION_CHUNK_SIZE = 512 * 1024
+UPLOAD_SESSION_MAX_SIZE = 20 * 1024 * 1024
+UPLOAD_SESSION_TTL = 60 * 60 * 24
+
+# Offline replays from drivers: items per batch call, and how long applied
+# idempotency keys are remembered.
+DRIVER_BATCH_MAX_ITEMS = 100
+DRIVER_ACTION_RECEIPT_RETENTION = 60 * 60 * 24 * 14
+
+# ======================
+# Exports
+# ======================
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_WIDTH_SAMPLE_ROWS = 200
+CUSTOMER_IMPORT_CHUNK_SIZE = 500
+INVOICE_BULK_MAX_ITEMS = 2000
+
+# Batch invoice PDFs: worker processes in each web process's shared pool
+# (default: one per CPU), how many of them one request may use at a time,
+# and invoices handed to a worker at a time.
+INVOICE_PDF_WORKERS = int(os.getenv("INVOICE_PDF_WORKERS", "0")) or None
+INVOICE_PDF_REQUEST_WORKERS = int(os.getenv("INVOICE_PDF_REQUEST_WORKERS", "2"))
+INVOICE_PDF_CHUNK_SIZE = 25
+INVOICE_PDF_BATCH_MAX_ITEMS = 2000
+# Rendered single-invoice PDFs and workbooks, reused until an input changes.
+# Kept outside MEDIA_ROOT since they are only served through the API.
+INVOICE_ARTIFACT_ROOT = os.path.join(BASE_DIR, "invoice_artifacts")
+# Identical export requests within this many seconds reuse the same job.
+EXPORT_JOB_REUSE_TTL = int(os.getenv("EXPORT_JOB_REUSE_TTL", "600"))
+EXPORT_JOB_RETENTION = 60 * 60 * 24
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 # ======================
@@ -179,11 +235,46 @@ CELERY_ACCEPT_CONTENT = ["json"]
 CELERY_TASK_SERIALIZER = "json"
 CELERY_RESULT_SERIALIZER = "json"
 CELERY_TIMEZONE = "UTC"
+CELERY_TASK_LOCK_TIMEOUT = 300
+
+# Orders are materialized this many days ahead of their delivery date.
+ORDER_SCHEDULE_HORIZON_DAYS = int(os.getenv("ORDER_SCHEDULE_HORIZON_DAYS", "14"))
+ORDER_SCHEDULE_CHUNK_SIZE = 1000
+
+# Delta syncs of the driver manifest re-send changes this many seconds older
+# than the client's token, covering writes that committed out of order.
+DRIVER_MANIFEST_SYNC_OVERLAP = 5
 
 CELERY_BEAT_SCHEDULE = {
+    "materialize_order_schedule": {
+        "task": "api.tasks.materialize_order_schedule",
+        "schedule": crontab(minute=10, hour=0),
+    },
     "generate_today_orders": {
         "task": "api.tasks.generate_today_orders",
-        "schedule": crontab(minute="*/1"),
+        "schedule": crontab(minute=0),
+    },
+    "rollup_recent_metrics": {
+        "task": "api.tasks.rollup_recent_metrics",
+        "schedule": crontab(minute="*/5"),
+    },
+    # Late confirmations and edits can still touch older days.
+    "rollup_monthly_metrics": {
+        "task": "api.tasks.rollup_recent_metrics",
+        "schedule": crontab(minute=30, hour=0),
+        "kwargs": {"days": 35},
+    },
+    "purge_export_jobs": {
+        "task": "api.tasks.purge_export_jobs",
+        "schedule": crontab(minute=15),
+    },
+    "purge_upload_sessions": {
+        "task": "api.tasks.purge_upload_sessions",
+        "schedule": crontab(minute=45),
+    },
+    "purge_action_receipts": {
+        "task": "api.tasks.purge_action_receipts",
+        "schedule": crontab(minute=50, hour=3),
     },
     "generate_recheck_invoices": {
         "task": "api.tasks.generate_recheck_invoices",